@@ -2,11 +2,19 @@
 """LINUX DO read-only helper via Discourse JSON API + Chrome Cookie auth (macOS)."""
 from __future__ import annotations
 
-import argparse, ctypes, ctypes.util, hashlib, html, json, os, re
-import sqlite3, subprocess, sys, tempfile, urllib.error, urllib.parse, urllib.request
+import argparse, base64, ctypes, ctypes.util, hashlib, html, http.client, json, os, pickle, re
+import sqlite3, subprocess, sys, tempfile, threading, time, urllib.parse
 
 BASE_URL = "https://linux.do"
 DEFAULT_TIMEOUT = 20
+MAX_REDIRECTS = 5
+DEBUG = bool(os.getenv("LINUXDO_DEBUG"))
+CACHE_DIR = os.getenv("LINUXDO_CACHE_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "linuxdo")
+MAX_PER_HOST = int(os.getenv("LINUXDO_MAX_PER_HOST") or 4)  # 每个 host 同时进行的请求上限
+TRANSPORT_TTL = 6 * 3600             # 记住"该 host 需走 curl"的时长（秒）
+TRANSPORT_PROBE_INTERVAL = 30 * 60   # 记忆期内每隔多久在后台重新试一次 http
+TRANSPORT_PROBE_WAIT = 2             # 退出前最多等后台探测多久（秒）；没跑完不记录，下次重新探测
 _CHROME_APP = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 _UA_TEMPLATE = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -175,6 +183,29 @@ def _get_ua() -> str:
         DEFAULT_UA = os.getenv("LINUXDO_UA") or _detect_chrome_ua()
     return DEFAULT_UA
 
+_PROXIES: dict[str, str] | None = None  # urllib.request.getproxies()，每个进程读一次
+_PROXY_FOR_HOST: dict[tuple[str, str], str | None] = {}
+
+def _proxy(url: str) -> str | None:
+    """url 应走的代理，规则同 urllib：环境变量（大小写均可）或 macOS 系统代理，并尊重 no_proxy / 系统例外。"""
+    global _PROXIES
+    parts = urllib.parse.urlsplit(url)
+    key = (parts.scheme, parts.hostname or "")
+    if key not in _PROXY_FOR_HOST:
+        from urllib.request import getproxies, proxy_bypass  # 只在真正发请求时加载
+        if _PROXIES is None:
+            _PROXIES = getproxies()
+        proxy = None
+        if _PROXIES and not proxy_bypass(key[1]):
+            proxy = (_PROXIES.get(key[0]) or _PROXIES.get("https") or _PROXIES.get("http")
+                     or _PROXIES.get("all"))
+        _PROXY_FOR_HOST[key] = proxy
+    return _PROXY_FOR_HOST[key]
+
+def _debug(msg: str) -> None:
+    if DEBUG:
+        print(f"[DEBUG] {msg}", file=sys.stderr)
+
 def _headers() -> dict[str, str]:
     h = {"User-Agent": _get_ua(), "Accept": "application/json"}
     if COOKIE_STRING:
@@ -186,64 +217,380 @@ def is_cloudflare_challenge(text: str) -> bool:
         "__cf_chl_opt", "__CF$cv$params", "Just a moment...",
         "Enable JavaScript and cookies to continue"))
 
-def _fetch_urllib(url: str, timeout: int) -> str:
-    req = urllib.request.Request(url, headers=_headers())
-    proxy = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
-    opener = urllib.request.build_opener(
-        urllib.request.ProxyHandler({"http": proxy, "https": proxy})) if proxy else urllib.request.build_opener()
+def _split_proxy(proxy: str) -> urllib.parse.SplitResult:
+    return urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+def _proxy_auth(proxy: urllib.parse.SplitResult) -> dict[str, str]:
+    if not proxy.username:
+        return {}
+    cred = f"{urllib.parse.unquote(proxy.username)}:{urllib.parse.unquote(proxy.password or '')}"
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(cred.encode()).decode()}
+
+class _Session:
+    """HTTP/1.1 keep-alive 连接池：按 (scheme, host, proxy) 复用连接，整个进程内共享（线程安全）。"""
+
+    def __init__(self) -> None:
+        self._idle: dict[tuple, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self, parts: urllib.parse.SplitResult, proxy: str | None,
+                 timeout: int) -> http.client.HTTPConnection:
+        https = parts.scheme == "https"
+        if not proxy:
+            cls = http.client.HTTPSConnection if https else http.client.HTTPConnection
+            return cls(parts.hostname, parts.port, timeout=timeout)
+        p = _split_proxy(proxy)
+        if not https:  # 明文请求直接发给代理（请求行使用绝对 URL）
+            return http.client.HTTPConnection(p.hostname, p.port or 80, timeout=timeout)
+        # HTTPS 经代理：CONNECT 隧道建立后再握手 TLS，隧道随连接一起复用
+        conn = http.client.HTTPSConnection(p.hostname, p.port or 80, timeout=timeout)
+        conn.set_tunnel(parts.hostname, parts.port or 443, headers=_proxy_auth(p))
+        return conn
+
+    def _acquire(self, key: tuple, parts: urllib.parse.SplitResult, proxy: str | None,
+                 timeout: int) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._connect(parts, proxy, timeout), False
+
+    def _release(self, key: tuple, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def _send(self, url: str, headers: dict[str, str],
+              timeout: int) -> tuple[int, http.client.HTTPMessage, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        proxy = _proxy(url)
+        key = (parts.scheme, parts.netloc, proxy)
+        if proxy and parts.scheme == "http":
+            target = url
+            headers = {**headers, **_proxy_auth(_split_proxy(proxy))}
+        else:
+            target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            conn, reused = self._acquire(key, parts, proxy, timeout)
+            start = time.monotonic()
+            try:
+                conn.request("GET", target, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except ConnectionError:
+                conn.close()
+                if reused:  # 服务端已关闭空闲连接：换一条新连接重试
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            with self._lock:
+                if reused: self.reuses += 1
+                else: self.connects += 1
+            _debug(f"GET {url} -> {resp.status} | {'复用' if reused else '新建'}连接 | "
+                   f"{(time.monotonic() - start) * 1000:.0f} ms")
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, resp.msg, body
+
+    def get(self, url: str, headers: dict[str, str],
+            timeout: int) -> tuple[int, http.client.HTTPMessage, bytes, str]:
+        """GET url（跟随重定向），返回 (status, headers, body, 最终 URL)。"""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, msg, body = self._send(url, headers, timeout)
+            if status in (301, 302, 303, 307, 308) and msg.get("Location"):
+                url = urllib.parse.urljoin(url, msg["Location"]); continue
+            return status, msg, body, url
+        raise FetchError(f"重定向次数过多: {url}")
+
+    def close(self) -> None:
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+_SESSION = _Session()
+
+# 传输层返回 (status, 小写响应头, 文本)；status 为 2xx 或 304（条件请求命中）
+Response = tuple[int, dict[str, str], str]
+
+def _fetch_http(url: str, timeout: int, extra: dict[str, str] | None = None) -> Response:
     try:
-        with opener.open(req, timeout=timeout) as resp:
-            return resp.read().decode(resp.headers.get_content_charset() or "utf-8", errors="replace")
-    except urllib.error.HTTPError as exc:
-        body = ""
-        try: body = exc.read(400).decode("utf-8", errors="replace")
-        except Exception: pass
-        raise FetchError(f"HTTP {exc.code}: {url}\n{body.strip()}") from exc
-    except urllib.error.URLError as exc:
+        status, msg, body, url = _SESSION.get(url, {**_headers(), **(extra or {})}, timeout)
+    except (OSError, http.client.HTTPException) as exc:
         raise FetchError(f"网络请求失败: {url}\n{exc}") from exc
+    if not (200 <= status < 300 or status == 304):
+        raise FetchError(f"HTTP {status}: {url}\n{body[:400].decode('utf-8', errors='replace').strip()}")
+    return (status, {k.lower(): v for k, v in msg.items()},
+            body.decode(msg.get_content_charset() or "utf-8", errors="replace"))
+
+def _split_curl_headers(raw: bytes) -> tuple[int, dict[str, str], bytes]:
+    """拆出 `curl -D -` 写在正文前的响应头（重定向/代理 CONNECT 各有一段，取最后一段）。"""
+    status, headers = 0, {}
+    while raw.startswith(b"HTTP/"):
+        head, sep, rest = raw.partition(b"\r\n\r\n")
+        if not sep:
+            break
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:])}
+        raw = rest
+    return status, headers, raw
 
-def _fetch_curl(url: str, timeout: int) -> str:
+def _fetch_curl(url: str, timeout: int, extra: dict[str, str] | None = None) -> Response:
     if not _which("curl"):
         raise FetchError("本机未检测到 curl")
-    cmd = ["curl", "-sS", "--fail", "--max-time", str(timeout), "-L",
+    cmd = ["curl", "-sS", "--fail", "--max-time", str(timeout), "-L", "-D", "-",
            "-A", _get_ua()]
-    proxy = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
-    if proxy:
-        cmd.extend(["--proxy", proxy])
-    for k, v in _headers().items():
+    proxy = _proxy(url)
+    cmd.extend(["--proxy", proxy] if proxy else ["--noproxy", "*"])
+    for k, v in {**_headers(), **(extra or {})}.items():
         if k.lower() != "user-agent":
             cmd.extend(["-H", f"{k}: {v}"])
     cmd.append(url)
     proc = subprocess.run(cmd, capture_output=True, check=False)
     if proc.returncode != 0:
         raise FetchError(f"curl 失败: {url}\n{proc.stderr.decode('utf-8', errors='replace').strip()}")
-    return proc.stdout.decode("utf-8", errors="replace")
+    status, headers, body = _split_curl_headers(proc.stdout)
+    return status or 200, headers, body.decode("utf-8", errors="replace")
 
-def fetch_text(url: str, timeout: int) -> str:
+# -- Transport memo --
+# 每个 host 最近一次成功（未命中 challenge）的通道记录在 CACHE_DIR/transport.json，
+# 跨进程共享：已知 http 会被 Cloudflare 拦截时直接走 curl，不再先下载一遍 challenge 页面。
+
+_TRANSPORT_LOCK = threading.Lock()
+_TRANSPORTS: dict | None = None
+_PROBES: dict[str, threading.Thread] = {}  # 本进程已启动的后台探测，每 host 一个
+
+def _transport_file() -> str:
+    return os.path.join(CACHE_DIR, "transport.json")
+
+def _read_transports() -> dict:
+    try:
+        with open(_transport_file(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return data if isinstance(data, dict) else {}
+
+def _load_transports() -> dict:
+    global _TRANSPORTS
+    if _TRANSPORTS is None:
+        _TRANSPORTS = _read_transports()
+    return _TRANSPORTS
+
+def _update_transport(host: str, **fields) -> None:
+    """重新读取文件、只改这个 host 的记录再原子写回，不覆盖其他进程期间写入的记录。
+
+    调用方需持有 _TRANSPORT_LOCK；写入失败（如只读目录）只意味着下次重新探测。
+    """
+    global _TRANSPORTS
+    data = _read_transports()
+    data[host] = {**(data.get(host) or {}), **fields}
+    _TRANSPORTS = data
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix="transport.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, _transport_file())
+    except OSError:
+        pass
+
+def _remembered_transport(host: str) -> str | None:
+    with _TRANSPORT_LOCK:
+        entry = _load_transports().get(host) or {}
+    if time.time() - entry.get("at", 0) < TRANSPORT_TTL:
+        return entry.get("transport")
+    return None
+
+def _remember_transport(host: str, transport: str) -> None:
+    with _TRANSPORT_LOCK:
+        entry, now = _load_transports().get(host) or {}, time.time()
+        if entry.get("transport") == transport and now - entry.get("at", 0) < TRANSPORT_TTL:
+            return  # 未变且未过期：不刷新 at，记忆到期后会重新验证
+        _update_transport(host, transport=transport, at=now, probed=now)
+
+def _start_probe(host: str, url: str, timeout: int) -> None:
+    """到了重新探测 http 的时间则在后台试一次（每个进程每 host 最多一次）。"""
+    with _TRANSPORT_LOCK:
+        entry = _load_transports().get(host)
+        if not entry or host in _PROBES or time.time() - entry.get("probed", 0) < TRANSPORT_PROBE_INTERVAL:
+            return
+        thread = _PROBES[host] = threading.Thread(target=_probe_http, args=(host, url, timeout), daemon=True)
+    thread.start()
+
+def _probe_http(host: str, url: str, timeout: int) -> None:
+    """探测跑完才记下 probed：http 可用则切回 http，否则只更新探测时间。"""
+    try:
+        _, _, text = _fetch_http(url, timeout=timeout)
+        usable = not is_cloudflare_challenge(text)
+    except (FetchError, UnicodeEncodeError):
+        usable = False
+    if usable:
+        _debug(f"后台探测: http 已可用，{url}")
+        _remember_transport(host, "http")
+    else:
+        with _TRANSPORT_LOCK:
+            _update_transport(host, probed=time.time())
+
+def _join_probes(timeout: float) -> None:
+    """退出前给后台探测一点时间跑完，否则守护线程随进程结束、结果丢失。"""
+    deadline = time.monotonic() + timeout
+    for thread in list(_PROBES.values()):
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+_HOST_SLOTS: dict[str, threading.BoundedSemaphore] = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+def _host_slot(host: str) -> threading.BoundedSemaphore:
+    with _HOST_SLOTS_LOCK:
+        return _HOST_SLOTS.setdefault(host, threading.BoundedSemaphore(MAX_PER_HOST))
+
+def _fetch(url: str, timeout: int, extra: dict[str, str] | None = None) -> Response:
+    """按通道记忆选择 http / curl，命中 Cloudflare challenge 时换另一个通道；每 host 并发受 MAX_PER_HOST 限制。"""
+    host = urllib.parse.urlsplit(url).hostname or ""
+    with _host_slot(host):
+        return _fetch_unlimited(url, host, timeout, extra)
+
+def _fetch_unlimited(url: str, host: str, timeout: int, extra: dict[str, str] | None) -> Response:
+    curl_err: FetchError | None = None
+    if _remembered_transport(host) == "curl":
+        _debug(f"{host}: 按通道记忆直接使用 curl")
+        _start_probe(host, url, timeout)  # 偶尔在后台试一次 http，成功则切回
+        try:
+            resp = _fetch_curl(url, timeout=timeout, extra=extra)
+            if not is_cloudflare_challenge(resp[2]):
+                return resp
+            curl_err = FetchError("curl 也命中 Cloudflare challenge")
+        except FetchError as exc:
+            curl_err = exc
     first_err = ""
     try:
-        text = _fetch_urllib(url, timeout=timeout)
-        if not is_cloudflare_challenge(text):
-            return text
-        first_err = "urllib 命中 Cloudflare challenge"
+        resp = _fetch_http(url, timeout=timeout, extra=extra)
+        if not is_cloudflare_challenge(resp[2]):
+            _remember_transport(host, "http")
+            return resp
+        first_err = "http 命中 Cloudflare challenge"
     except (FetchError, UnicodeEncodeError) as exc:
         first_err = str(exc)
     try:
-        text = _fetch_curl(url, timeout=timeout)
-        if not is_cloudflare_challenge(text):
-            return text
+        if curl_err:
+            raise curl_err
+        resp = _fetch_curl(url, timeout=timeout, extra=extra)
+        if not is_cloudflare_challenge(resp[2]):
+            _remember_transport(host, "curl")
+            return resp
         raise FetchError("curl 也命中 Cloudflare challenge")
     except FetchError as exc:
         raise FetchError(
-            f"请求失败（urllib + curl）。\nurllib: {first_err}\ncurl: {exc}\n"
+            f"请求失败（http + curl）。\nhttp: {first_err}\ncurl: {exc}\n"
             "建议：配置代理或设置 Cookie 后重试。") from exc
 
-def fetch_json(url: str, timeout: int) -> dict | list:
-    text = fetch_text(url, timeout=timeout)
+def fetch_text(url: str, timeout: int) -> str:
+    return _fetch(url, timeout)[2]
+
+# -- HTTP response cache --
+# fetch_json 的响应按 (URL, 登录身份) 缓存在 CACHE_DIR/http/：新鲜期内直接返回，
+# 过期后带 If-None-Match / If-Modified-Since 重新验证，304 时复用已解析的数据（不传输、不解析 JSON）。
+
+HTTP_CACHE_ENABLED = not os.getenv("LINUXDO_NO_CACHE")
+HTTP_CACHE_MAX_AGE: int | None = None   # --max-age：覆盖下表的新鲜期
+HTTP_CACHE_MAX_ENTRIES = 500
+HTTP_CACHE_TTLS = [  # (路径正则, 新鲜期秒数)；0 表示每次都条件请求
+    (r"^/session/", 0),
+    (r"^/categories\.json", 3600),
+    (r"^/top\.json", 600),
+    (r"^/search\.json", 300),
+    (r"^/t/", 120),
+    (r"/latest\.json", 60),
+]
+HTTP_CACHE_DEFAULT_TTL = 60
+
+def _cache_ttl(url: str) -> int:
+    if HTTP_CACHE_MAX_AGE is not None:
+        return HTTP_CACHE_MAX_AGE
+    path = urllib.parse.urlsplit(url).path
+    for pattern, ttl in HTTP_CACHE_TTLS:
+        if re.search(pattern, path):
+            return ttl
+    return HTTP_CACHE_DEFAULT_TTL
+
+def _cookie_identity() -> str:
+    """登录身份：Discourse 会话 cookie `_t` 的摘要；cf_clearance 等变化不影响缓存。"""
+    for pair in (COOKIE_STRING or "").split(";"):
+        name, _, value = pair.strip().partition("=")
+        if name == "_t" and value:
+            return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+    return "anon"
+
+def _cache_entry_path(url: str) -> str:
+    key = hashlib.sha1(f"{_cookie_identity()}\0{url}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, "http", f"{key}.pickle")
+
+def _cache_read(path: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and "data" in entry else None
+
+def _cache_write(path: str, entry: dict) -> None:
+    """原子写入并在条目过多时清掉最久未验证的；失败只意味着下次重新请求。"""
+    directory = os.path.dirname(path)
     try:
-        return json.loads(text)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        names = os.listdir(directory)
+        if len(names) > HTTP_CACHE_MAX_ENTRIES:
+            files = sorted((os.path.join(directory, n) for n in names), key=os.path.getmtime)
+            for stale in files[:len(files) - HTTP_CACHE_MAX_ENTRIES]:
+                os.unlink(stale)
+    except OSError:
+        pass
+
+def fetch_json(url: str, timeout: int, cache: bool = True) -> dict | list:
+    path = _cache_entry_path(url) if HTTP_CACHE_ENABLED and cache else ""
+    entry = _cache_read(path) if path else None
+    extra: dict[str, str] = {}
+    if entry:
+        age = time.time() - os.path.getmtime(path)  # 文件 mtime = 上次从服务端确认的时间
+        if age < _cache_ttl(url):
+            _debug(f"缓存命中（{age:.0f}s 前确认）: {url}")
+            return entry["data"]
+        if entry.get("etag"):
+            extra["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            extra["If-Modified-Since"] = entry["last_modified"]
+    status, headers, text = _fetch(url, timeout, extra)
+    if status == 304 and entry:
+        _debug(f"304 未修改，复用缓存: {url}")
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["data"]
+    try:
+        data = json.loads(text)
     except json.JSONDecodeError as exc:
         raise FetchError(f"JSON 解析失败: {url}\n{exc}\n{text[:300]}") from exc
+    if path and "no-store" not in headers.get("cache-control", ""):
+        _cache_write(path, {"url": url, "etag": headers.get("etag"),
+                            "last_modified": headers.get("last-modified"), "data": data})
+    return data
 
 # -- Output formatting --
 
@@ -365,7 +712,8 @@ def _parse_topic_ref(ref: str) -> int:
     if ref.isdigit(): return int(ref)
     raise FetchError("无法解析 topic 参数。支持: URL / slug/id / id")
 
-def _fetch_topic_json(topic_id: int, timeout: int, post_number: int | None = None) -> dict:
+def _fetch_topic_json(topic_id: int, timeout: int, post_number: int | None = None,
+                      cache: bool = True) -> dict:
     """
     Some Cloudflare rules block `/t/<id>.json` and `/posts.json`.
     Prefer `/t/topic/<id>.json` and use `post_number` for pagination.
@@ -384,7 +732,7 @@ def _fetch_topic_json(topic_id: int, timeout: int, post_number: int | None = Non
     last_err: FetchError | None = None
     for url in urls:
         try:
-            data = fetch_json(url, timeout=timeout)
+            data = fetch_json(url, timeout=timeout, cache=cache)
             if isinstance(data, dict):
                 return data
             raise FetchError(f"topic 接口返回异常结构: {url}")
@@ -394,8 +742,7 @@ def _fetch_topic_json(topic_id: int, timeout: int, post_number: int | None = Non
     assert last_err is not None
     raise last_err
 
-def cmd_topic(args: argparse.Namespace) -> int:
-    topic_id = _parse_topic_ref(args.topic)
+def _render_topic(topic_id: int, args: argparse.Namespace) -> str:
     data = _fetch_topic_json(topic_id, timeout=args.timeout)
     title = data.get("title") or data.get("fancy_title") or ""
     cat = _cat_name(data.get("category_id", 0))
@@ -403,9 +750,7 @@ def cmd_topic(args: argparse.Namespace) -> int:
     if cat: meta.append(f"分类: {cat}")
     meta += [f"回复: {data.get('reply_count', 0)}", f"浏览: {data.get('views', 0)}",
              f"赞: {data.get('like_count', 0)}", f"创建: {data.get('created_at', '-')}"]
-    print(f"主题: {title}")
-    print("  " + " | ".join(meta))
-    print(f"  链接: {BASE_URL}/t/{topic_id}\n")
+    out = [f"主题: {title}", "  " + " | ".join(meta), f"  链接: {BASE_URL}/t/{topic_id}\n"]
     ps = data.get("post_stream") or {}
     posts = ps.get("posts") or []
     if args.page > 0:
@@ -419,18 +764,175 @@ def cmd_topic(args: argparse.Namespace) -> int:
         ]
         posts = page_posts or raw_posts
     if not posts:
-        print("未获取到楼层内容。"); return 0
+        out.append("未获取到楼层内容。")
+        return "\n".join(out)
     for idx, p in enumerate(posts[:args.posts], start=1):
         likes = 0
         for a in (p.get("actions_summary") or []):
             if a.get("id") == 2: likes = a.get("count", 0); break
         content = strip_html(p.get("cooked", ""))
-        print(f"[#{p.get('post_number', idx)}] @{p.get('username', '-')} | "
-              f"时间: {p.get('created_at', '-')} | 赞: {likes}")
+        out.append(f"[#{p.get('post_number', idx)}] @{p.get('username', '-')} | "
+                   f"时间: {p.get('created_at', '-')} | 赞: {likes}")
         if content:
-            print(f"  {truncate(content, args.chars)}")
-        print()
-    return 0
+            out.append(f"  {truncate(content, args.chars)}")
+        out.append("")
+    return "\n".join(out)
+
+def _topic_refs(args: argparse.Namespace) -> list[str]:
+    refs = [r for r in args.topic if r != "-"]
+    # 显式 - 或未给参数且 stdin 是管道/文件时从 stdin 读取（空白分隔）；终端上不阻塞等待输入
+    if "-" in args.topic or (not args.topic and not sys.stdin.isatty()):
+        refs += sys.stdin.read().split()
+    return refs
+
+def cmd_topic(args: argparse.Namespace) -> int:
+    refs = _topic_refs(args)
+    if not refs:
+        raise FetchError("未提供 topic 参数。支持: URL / slug/id / id（多个或 - 从 stdin 读取）")
+    if len(refs) == 1:
+        print(_render_topic(_parse_topic_ref(refs[0]), args))
+        return 0
+    # 多个帖子并发抓取（线程池 + 每 host 连接上限），按输入顺序逐个输出
+    from concurrent.futures import ThreadPoolExecutor
+    def render(ref: str) -> str:
+        return _render_topic(_parse_topic_ref(ref), args)
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, len(refs)))) as pool:
+        for ref, future in [(ref, pool.submit(render, ref)) for ref in refs]:
+            try:
+                print(future.result(), flush=True)
+            except FetchError as exc:
+                failed += 1
+                print(f"[ERROR] {ref}: {exc}\n", file=sys.stderr, flush=True)
+    return 2 if failed else 0
+
+# -- Export --
+
+EXPORT_BATCH = 20  # 每次 posts.json 请求的楼层数（Discourse 单次上限）
+
+def _fetch_post_batch(topic_id: int, ids: list[int], post_number: int, timeout: int) -> list[dict]:
+    """按 id 批量取楼层，按 ids 顺序返回（已删除/不可见的楼层会缺失）。
+
+    posts.json 被拦截时退回 `/t/topic/<id>.json?post_number=N` 分段读取，N 从 post_number
+    （首个 id 在 stream 中的位置 + 1）起。导出的批次只读一次，不经过磁盘缓存。
+    """
+    query = urllib.parse.urlencode([("post_ids[]", i) for i in ids])
+    try:
+        data = fetch_json(f"{BASE_URL}/t/{topic_id}/posts.json?{query}", timeout=timeout, cache=False)
+        by_id = {p.get("id"): p for p in ((data.get("post_stream") or {}).get("posts") or [])}
+    except FetchError as exc:
+        _debug(f"posts.json 失败，改用 post_number 分段读取: {exc}")
+        by_id = _fetch_post_windows(topic_id, set(ids), post_number, timeout)
+        if not by_id:
+            raise FetchError("posts.json 被拦截，post_number 分段也未取到楼层") from exc
+    return [by_id[i] for i in ids if i in by_id]
+
+def _fetch_post_windows(topic_id: int, wanted: set[int], post_number: int, timeout: int) -> dict[int, dict]:
+    """从 post_number 起逐段向后读，直到集齐 wanted 或不再前进；中途失败时返回已取到的部分。
+
+    有删除楼层时实际楼层号只会大于 stream 位置，所以从估计值往后找不会漏。
+    """
+    found: dict[int, dict] = {}
+    for _ in range(len(wanted)):  # 每段至少前进一层
+        try:
+            data = _fetch_topic_json(topic_id, timeout, post_number=post_number, cache=False)
+        except FetchError:
+            if not found:
+                raise
+            break
+        posts = (data.get("post_stream") or {}).get("posts") or []
+        found.update((p.get("id"), p) for p in posts if p.get("id") in wanted)
+        last = max((int(p.get("post_number") or 0) for p in posts), default=0)
+        if len(found) == len(wanted) or last < post_number:
+            break
+        post_number = last + 1
+    return found
+
+def _iter_topic_posts(topic_id: int, data: dict, args: argparse.Namespace, errors: list[str]):
+    """按 post_stream.stream 的顺序逐楼产出：首屏楼层直接用，其余按批并发抓取。
+
+    同时在途的批次不超过 2 × jobs，内存只与窗口大小有关，与帖子总楼层数无关。
+    整批失败时记入 errors 并跳过该批，其余楼层照常导出。
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    ps = data.get("post_stream") or {}
+    loaded = {p.get("id"): p for p in ps.get("posts") or []}
+    stream = ps.get("stream") or list(loaded)
+    # 首屏之外的 id 按原顺序切批；首屏楼层在各自位置原样输出
+    chunks: list[tuple[int, list[int]] | dict] = []  # (首个 id 的估计楼层号, ids) 或已有楼层
+    for pos, pid in enumerate(stream, start=1):
+        if pid in loaded:
+            chunks.append(loaded[pid])
+        elif chunks and isinstance(chunks[-1], tuple) and len(chunks[-1][1]) < EXPORT_BATCH:
+            chunks[-1][1].append(pid)
+        else:
+            chunks.append((pos, [pid]))
+    loaded.clear()
+    jobs = max(1, args.jobs)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending: deque = deque()
+        items = iter(chunks)
+        def refill() -> None:
+            while len(pending) < 2 * jobs:
+                chunk = next(items, None)
+                if chunk is None:
+                    return
+                pending.append((chunk, pool.submit(_fetch_post_batch, topic_id, chunk[1], chunk[0], args.timeout)
+                                if isinstance(chunk, tuple) else None))
+        refill()
+        while pending:
+            chunk, future = pending.popleft()
+            try:
+                posts = future.result() if future else [chunk]
+            except FetchError as exc:
+                errors.append(f"楼层 id {chunk[1][0]}..{chunk[1][-1]}: {exc}")
+                print(f"[ERROR] {errors[-1]}", file=sys.stderr, flush=True)
+                posts = []
+            refill()
+            if future and len(posts) < len(chunk[1]):
+                _debug(f"{len(chunk[1]) - len(posts)} 个楼层未返回（已删除、不可见或读取失败）")
+            yield from posts
+
+def _post_record(topic_id: int, p: dict) -> dict:
+    likes = 0
+    for a in (p.get("actions_summary") or []):
+        if a.get("id") == 2: likes = a.get("count", 0); break
+    return {"topic_id": topic_id, "id": p.get("id"), "post_number": p.get("post_number"),
+            "username": p.get("username"), "created_at": p.get("created_at"),
+            "reply_to_post_number": p.get("reply_to_post_number"), "likes": likes,
+            "text": strip_html(p.get("cooked", "")), "cooked": p.get("cooked", "")}
+
+def cmd_export(args: argparse.Namespace) -> int:
+    topic_id = _parse_topic_ref(args.topic)
+    data = _fetch_topic_json(topic_id, timeout=args.timeout)
+    fmt = args.format or ("jsonl" if (args.output or "").endswith(".jsonl") else "markdown")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count, errors = 0, []
+    try:
+        if fmt == "markdown":
+            title = data.get("title") or data.get("fancy_title") or ""
+            out.write(f"# {title}\n\n{BASE_URL}/t/{topic_id} | 楼层: {data.get('posts_count', '-')} | "
+                      f"创建: {data.get('created_at', '-')}\n\n")
+        for p in _iter_topic_posts(topic_id, data, args, errors):
+            rec = _post_record(topic_id, p)
+            if fmt == "jsonl":
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            else:
+                out.write(f"## #{rec['post_number']} @{rec['username']} | {rec['created_at']} | 赞: {rec['likes']}\n\n"
+                          f"{rec['text']}\n\n")
+            out.flush()
+            count += 1
+    except BrokenPipeError:  # stdout 被提前关闭（如 | head），静默退出
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = len((data.get("post_stream") or {}).get("stream") or []) or count
+    print(f"已导出 {count}/{total} 个楼层" + (f" -> {args.output}" if args.output else "")
+          + (f"，{len(errors)} 批读取失败" if errors else ""), file=sys.stderr)
+    return 2 if errors else 0
 
 def cmd_category(args: argparse.Namespace) -> int:
     if not args.category:
@@ -469,6 +971,11 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--cookie", default=None, help="Cookie 字符串")
     p.add_argument("--cookie-file", default=os.getenv("LINUXDO_COOKIE_FILE"),
                    help="Cookie 文件路径")
+    p.add_argument("--no-cache", action="store_true", help="不读写本地响应缓存（也可设 LINUXDO_NO_CACHE=1）")
+    p.add_argument("--max-age", type=int, default=None, metavar="SECONDS",
+                   help="缓存新鲜期（秒），覆盖各接口默认值；0 表示每次都向服务端确认")
+    p.add_argument("--debug", action="store_true", default=DEBUG,
+                   help="在 stderr 输出请求耗时与连接复用统计（也可设 LINUXDO_DEBUG=1）")
     sub = p.add_subparsers(dest="subcommand", required=True)
 
     sub.add_parser("whoami", help="查看当前登录身份").set_defaults(func=cmd_whoami)
@@ -492,13 +999,22 @@ def build_parser() -> argparse.ArgumentParser:
     s.add_argument("--chars", type=int, default=140)
     s.set_defaults(func=cmd_search)
 
-    s = sub.add_parser("topic", help="帖子详情")
-    s.add_argument("topic", help="URL / slug/id / id")
+    s = sub.add_parser("topic", help="帖子详情（可一次多个）")
+    s.add_argument("topic", nargs="*", help="URL / slug/id / id，可给多个；- 或省略且 stdin 为管道时从 stdin 读取")
+    s.add_argument("--jobs", type=int, default=8, help="多个帖子时的并发数（默认 8）")
     s.add_argument("--posts", type=int, default=5)
     s.add_argument("--chars", type=int, default=300)
     s.add_argument("--page", type=int, default=0)
     s.set_defaults(func=cmd_topic)
 
+    s = sub.add_parser("export", help="导出整帖全部楼层（流式写出）")
+    s.add_argument("topic", help="URL / slug/id / id")
+    s.add_argument("--output", "-o", default=None, help="输出文件（默认 stdout）")
+    s.add_argument("--format", choices=["markdown", "jsonl"], default=None,
+                   help="输出格式（默认按 --output 扩展名推断，.jsonl 为 jsonl，否则 markdown）")
+    s.add_argument("--jobs", type=int, default=4, help="并发批次数（默认 4）")
+    s.set_defaults(func=cmd_export)
+
     s = sub.add_parser("category", help="分类列表或分类帖子")
     s.add_argument("category", nargs="?")
     s.add_argument("--limit", type=int, default=20)
@@ -509,7 +1025,11 @@ def build_parser() -> argparse.ArgumentParser:
     return p
 
 def main() -> int:
+    global DEBUG, HTTP_CACHE_ENABLED, HTTP_CACHE_MAX_AGE
     args = build_parser().parse_args()
+    DEBUG = args.debug
+    HTTP_CACHE_ENABLED = HTTP_CACHE_ENABLED and not args.no_cache
+    HTTP_CACHE_MAX_AGE = args.max_age
     try:
         resolve_cookie(args)
         return args.func(args)
@@ -517,6 +1037,10 @@ def main() -> int:
         print(f"[ERROR] {exc}", file=sys.stderr); return 2
     except KeyboardInterrupt:
         print("\n[ERROR] 用户中断。", file=sys.stderr); return 130
+    finally:
+        _join_probes(TRANSPORT_PROBE_WAIT)
+        _debug(f"连接统计: 新建 {_SESSION.connects} 次, 复用 {_SESSION.reuses} 次")
+        _SESSION.close()
 
 if __name__ == "__main__":
     sys.exit(main())
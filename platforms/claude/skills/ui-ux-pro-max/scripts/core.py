@@ -5,60 +5,130 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import os
 import re
+import sys
+import time
+import zlib
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from itertools import chain
+from array import array
+
+try:  # the C unpickler alone: pickle.py costs ~2 ms to import and is only needed to write caches
+    from _pickle import UnpicklingError, loads as _unpickle
+except ImportError:
+    from pickle import UnpicklingError, loads as _unpickle
 
 # ============ CONFIGURATION ============
+# Each search config lists search_cols (indexed), optional per-column BM25F
+# weights (default 1.0), output_cols (returned), optional key columns that
+# get an exact-value lookup table for design_system() and optional filter
+# columns that get per-value row bitmaps for "column:value" query filters.
+# Stacks share _STACK_COLS.
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
 
+# Fitted indexes are cached per CSV so repeated runs skip parsing and BM25.fit
+CACHE_DIR = Path(os.environ.get("UIPRO_CACHE_DIR") or
+                 Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ui-ux-pro-max")
+CACHE_ENABLED = os.environ.get("UIPRO_NO_CACHE", "") in ("", "0")
+# Unix socket of a warm server (search.py --serve); the CLI forwards to it when present
+SOCKET_PATH = Path(os.environ.get("UIPRO_SOCKET") or CACHE_DIR / "search.sock")
+INDEX_VERSION = 11
+CACHE_MMAP_MIN_BYTES = 1 << 20  # cache files at least this large are mapped instead of read
+
+# Typo tolerance: unknown query tokens expand to close vocabulary terms (SymSpell-style)
+FUZZY_MIN_LEN = 4         # shorter unknown tokens are left alone
+FUZZY_MAX_DISTANCE = 2    # edit distance indexed; tokens under 8 chars are corrected by 1 at most
+FUZZY_PREFIX_LEN = 7      # deletes are generated from this many leading chars
+FUZZY_MAX_EXPANSIONS = 3  # vocabulary terms a single unknown token may expand to
+FUZZY_WEIGHTS = {0: 0.9, 1: 0.8, 2: 0.6}  # score multiplier: prefix match (0) or edit distance
+
+# Batch scoring uses NumPy when installed; UIPRO_ENGINE=python forces the pure-Python loop
+ENGINE = os.environ.get("UIPRO_ENGINE", "auto")
+
+# Optional semantic rerank (--rerank, needs NumPy): LSA vectors rescore the BM25 top candidates
+LSA_DIMS = 64        # latent dimensions kept from the truncated SVD
+RERANK_DEPTH = 30    # BM25 candidates rescored per query
+RERANK_WEIGHT = 0.5  # share of the cosine similarity in the final score (rest: BM25 / best BM25)
+
+# Search results are cached per (normalized query, CSV version, options): an in-memory LRU
+# in front of an SQLite file in CACHE_DIR that concurrent CLI runs share
+RESULT_MEMO_SIZE = 256       # results kept in memory per process
+RESULT_CACHE_ENTRIES = 5000  # results kept on disk; least recently used ones are dropped first
+# A shared lookup costs ~6 ms (importing sqlite3, connecting) while searching a prebuilt
+# index costs ~1 ms per 100 KB of CSV, so only CSVs this large use the SQLite file
+RESULT_CACHE_MIN_BYTES = 512 * 1024
+
+# Missing indexes are built in a process pool, one CSV per worker (0 = one per CPU, 1 = serial).
+# The server sets 1 once preloaded: forking a pool from its request threads can deadlock
+BUILD_WORKERS = int(os.environ.get("UIPRO_BUILD_WORKERS") or 0)
+
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
         "search_cols": ["Style Category", "Keywords", "Best For", "Type"],
-        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity"]
+        "weights": {"Style Category": 3.0, "Keywords": 2.0, "Best For": 1.0, "Type": 0.5},
+        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity"],
+        "keys": ["Style Category"],
+        "filters": ["Type", "Light Mode ✓", "Dark Mode ✓", "Mobile-Friendly", "Conversion-Focused", "Performance",
+                    "Accessibility", "Complexity"]
     },
     "prompt": {
         "file": "prompts.csv",
         "search_cols": ["Style Category", "AI Prompt Keywords (Copy-Paste Ready)", "CSS/Technical Keywords"],
+        "weights": {"Style Category": 3.0, "AI Prompt Keywords (Copy-Paste Ready)": 1.5, "CSS/Technical Keywords": 1.0},
         "output_cols": ["Style Category", "AI Prompt Keywords (Copy-Paste Ready)", "CSS/Technical Keywords", "Implementation Checklist"]
     },
     "color": {
         "file": "colors.csv",
         "search_cols": ["Product Type", "Keywords", "Notes"],
-        "output_cols": ["Product Type", "Keywords", "Primary (Hex)", "Secondary (Hex)", "CTA (Hex)", "Background (Hex)", "Text (Hex)", "Border (Hex)", "Notes"]
+        "weights": {"Product Type": 3.0, "Keywords": 2.0, "Notes": 0.5},
+        "output_cols": ["Product Type", "Keywords", "Primary (Hex)", "Secondary (Hex)", "CTA (Hex)", "Background (Hex)", "Text (Hex)", "Border (Hex)", "Notes"],
+        "keys": ["Notes", "Product Type"]
     },
     "chart": {
         "file": "charts.csv",
         "search_cols": ["Data Type", "Keywords", "Best Chart Type", "Accessibility Notes"],
+        "weights": {"Data Type": 3.0, "Keywords": 2.0, "Best Chart Type": 1.5, "Accessibility Notes": 0.5},
         "output_cols": ["Data Type", "Keywords", "Best Chart Type", "Secondary Options", "Color Guidance", "Accessibility Notes", "Library Recommendation", "Interactive Level"]
     },
     "landing": {
         "file": "landing.csv",
         "search_cols": ["Pattern Name", "Keywords", "Conversion Optimization", "Section Order"],
+        "weights": {"Pattern Name": 3.0, "Keywords": 2.0, "Conversion Optimization": 0.75, "Section Order": 0.75},
         "output_cols": ["Pattern Name", "Keywords", "Section Order", "Primary CTA Placement", "Color Strategy", "Conversion Optimization"]
     },
     "product": {
         "file": "products.csv",
         "search_cols": ["Product Type", "Keywords", "Primary Style Recommendation", "Key Considerations"],
+        "weights": {"Product Type": 3.0, "Keywords": 2.0, "Primary Style Recommendation": 1.0, "Key Considerations": 0.5},
         "output_cols": ["Product Type", "Keywords", "Primary Style Recommendation", "Secondary Styles", "Landing Page Pattern", "Dashboard Style (if applicable)", "Color Palette Focus"]
     },
     "ux": {
         "file": "ux-guidelines.csv",
         "search_cols": ["Category", "Issue", "Description", "Platform"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "weights": {"Category": 2.0, "Issue": 3.0, "Description": 1.0, "Platform": 1.0},
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "filters": ["Category", "Platform", "Severity"]
     },
     "typography": {
         "file": "typography.csv",
         "search_cols": ["Font Pairing Name", "Category", "Mood/Style Keywords", "Best For", "Heading Font", "Body Font"],
-        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"]
+        "weights": {"Font Pairing Name": 2.0, "Category": 1.5, "Mood/Style Keywords": 2.5, "Best For": 1.5, "Heading Font": 1.0, "Body Font": 1.0},
+        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"],
+        "keys": ["Mood/Style Keywords"],
+        "filters": ["Category"]
     },
     "icons": {
         "file": "icons.csv",
         "search_cols": ["Category", "Icon Name", "Keywords", "Best For"],
-        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"]
+        "weights": {"Category": 1.5, "Icon Name": 3.0, "Keywords": 2.0, "Best For": 1.0},
+        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"],
+        "filters": ["Category", "Library", "Style"]
     }
 }
 
@@ -79,110 +149,1438 @@ STACK_CONFIG = {
 # Common columns for all stacks
 _STACK_COLS = {
     "search_cols": ["Category", "Guideline", "Description", "Do", "Don't"],
-    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"]
+    "weights": {"Category": 2.0, "Guideline": 3.0, "Description": 1.0, "Do": 0.75, "Don't": 0.75},
+    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"],
+    "filters": ["Category", "Severity"]
 }
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
+# ============ DATA PACKS ============
+# Extra guideline packs are directories holding a pack.json, listed in
+# UIPRO_DATA_PATH (os.pathsep-separated) and/or the "packs" array of
+# PACKS_FILE. pack.json maps names to configs shaped like CSV_CONFIG /
+# STACK_CONFIG entries, with files relative to the pack directory:
+#   {"domains": {"tokens": {"file": "tokens.csv", "search_cols": [...], "output_cols": [...],
+#                           "weights": {...}?, "detect": ["token", ...]?}},
+#    "stacks": {"acme-ui": {"file": "acme-ui.csv"}}}
+# A stack may carry its own search_cols/weights/output_cols instead of _STACK_COLS.
+PACKS_FILE = Path(os.environ.get("UIPRO_PACKS_FILE") or
+                  Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config") / "ui-ux-pro-max" / "packs.json")
+
+
+def _warn(message):
+    print(f"[ui-ux-pro-max] {message}", file=sys.stderr)
+
+
+def _pack_dirs():
+    dirs = [d for d in os.environ.get("UIPRO_DATA_PATH", "").split(os.pathsep) if d]
+    if PACKS_FILE.is_file():
+        import json
+        try:
+            with open(PACKS_FILE, 'r', encoding='utf-8') as f:
+                listed = json.load(f).get("packs", [])
+        except (OSError, ValueError, AttributeError) as exc:
+            _warn(f"ignoring {PACKS_FILE}: {exc}")
+        else:
+            dirs += [str(PACKS_FILE.parent / d) for d in listed if isinstance(d, str)]
+    return list(dict.fromkeys(str(Path(d).expanduser().resolve()) for d in dirs))
+
+
+def register_pack(directory):
+    """Merge one pack's domains and stacks into CSV_CONFIG / STACK_CONFIG.
+
+    Files are stored as absolute paths (DATA_DIR / abs_path is abs_path).
+    Names already registered are skipped with a warning, as are entries
+    missing their file or columns. Returns the names that were added.
+    """
+    import json
+    directory = Path(directory)
+    try:
+        with open(directory / "pack.json", 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+    except (OSError, ValueError) as exc:
+        _warn(f"skipping pack {directory}: {exc}")
+        return []
+
+    added = []
+    for kind, registry, required in (("domains", CSV_CONFIG, ("file", "search_cols", "output_cols")),
+                                     ("stacks", STACK_CONFIG, ("file",))):
+        entries = pack.get(kind) or {}
+        for name, config in (entries.items() if isinstance(entries, dict) else ()):
+            if name in registry or (kind == "domains" and name == "all"):
+                _warn(f"pack {directory}: {kind[:-1]} '{name}' already registered, skipped")
+                continue
+            if not isinstance(config, dict) or any(key not in config for key in required):
+                _warn(f"pack {directory}: {kind[:-1]} '{name}' needs {', '.join(required)}, skipped")
+                continue
+            registry[name] = dict(config, file=str(directory / config["file"]))
+            if kind == "stacks":
+                AVAILABLE_STACKS.append(name)
+            added.append(name)
+    return added
+
+
+def _stack_config(stack):
+    """Search config of a stack: its own columns if a pack gave any, else _STACK_COLS"""
+    config = STACK_CONFIG[stack]
+    return config if "search_cols" in config else _STACK_COLS
+
+
+for _pack in _pack_dirs():
+    register_pack(_pack)
+
+
+# ============ PROFILING ============
+_PROFILER = None  # active Profiler, installed by profiling()
+
+
+class Profiler:
+    """Wall time, call count and allocations per named phase.
+
+    Phases nest (fit contains tokenize) and are inclusive. With allocations
+    on, tracemalloc records the bytes a phase left allocated (alloc_kb) and
+    the peak it reached above its starting point (peak_kb). Tracing slows
+    everything down, so only compare ms between runs with the same setting.
+    """
+
+    def __init__(self, allocations=True):
+        import threading
+        self.allocations = allocations
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def phase(self, name):
+        tracing = self.allocations and _tracemalloc().is_tracing()
+        stack = self._local.__dict__.setdefault("stack", [])
+        if tracing:
+            current, peak = _tracemalloc().get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            _tracemalloc().reset_peak()
+            frame = [current, current]
+        else:
+            frame = None
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            stack.pop()
+            alloc = peak = None
+            if tracing:
+                current, traced_peak = _tracemalloc().get_traced_memory()
+                top = max(frame[1], traced_peak)
+                alloc, peak = current - frame[0], top - frame[0]
+                if stack and stack[-1] is not None:
+                    stack[-1][1] = max(stack[-1][1], top)
+            self.add(name, ms, alloc=alloc, peak=peak)
+
+    def add(self, name, ms, calls=1, alloc=None, peak=None):
+        with self._lock:
+            entry = self.phases.setdefault(name, {"ms": 0.0, "calls": 0})
+            entry["ms"] += ms
+            entry["calls"] += calls
+            if alloc is not None:
+                entry["alloc_kb"] = entry.get("alloc_kb", 0) + alloc / 1024
+                entry["peak_kb"] = max(entry.get("peak_kb", 0), peak / 1024)
+
+    def report(self):
+        """{phase: {"ms", "calls", "alloc_kb"?, "peak_kb"?}} in first-seen order"""
+        return {name: {key: round(value, 3) if isinstance(value, float) else value for key, value in entry.items()}
+                for name, entry in self.phases.items()}
+
+    def format(self):
+        lines = [f"{'phase':<12} {'ms':>10} {'calls':>7} {'alloc_kb':>10} {'peak_kb':>10}"]
+        for name, entry in self.report().items():
+            lines.append(f"{name:<12} {entry['ms']:>10.3f} {entry['calls']:>7} "
+                         f"{entry.get('alloc_kb', '-'):>10} {entry.get('peak_kb', '-'):>10}")
+        return "\n".join(lines)
+
+
+def _tracemalloc():
+    import tracemalloc
+    return tracemalloc
+
+
+@contextmanager
+def profiling(profiler=None):
+    """Install a Profiler for the calls made inside the block and yield it.
+
+    Phases recorded: cache_read, lock_wait, csv_read, tokenize, fit,
+    cache_write, score, project (plus whatever callers time with profiler.phase, e.g.
+    format in cli.py). tracemalloc is started here when the profiler
+    tracks allocations and was not already tracing.
+    """
+    global _PROFILER
+    profiler = profiler or Profiler()
+    started = profiler.allocations and not _tracemalloc().is_tracing()
+    if started:
+        _tracemalloc().start()
+    previous, _PROFILER = _PROFILER, profiler
+    try:
+        yield profiler
+    finally:
+        _PROFILER = previous
+        if started:
+            _tracemalloc().stop()
+
+
+def _phase(name):
+    """profiler.phase(name) while profiling, otherwise a no-op context"""
+    return _PROFILER.phase(name) if _PROFILER else nullcontext()
+
+
 # ============ BM25 IMPLEMENTATION ============
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25F ranking algorithm for text search (plain BM25 for single-field documents)"""
 
     def __init__(self, k1=1.5, b=0.75):
         self.k1 = k1
         self.b = b
-        self.corpus = []
+        self.field_weights = (1.0,)
+        self.field_postings = [{}]
+        self.field_lengths = []
         self.doc_lengths = []
         self.avgdl = 0
         self.idf = {}
-        self.doc_freqs = defaultdict(int)
+        self.doc_freqs = {}
+        self.postings = {}
+        self.vocab = []
+        self.deletes = {}
         self.N = 0
+        self._sparse = None
+
+    # Only typo expansion and append() read these, yet they are most of a
+    # pickled index: they are stored as nested pickles, decoded on first use
+    _LAZY_STATE = ("deletes", "field_postings")
+
+    def __getstate__(self):
+        # The sparse matrix is derived from postings; rebuild it per process
+        import pickle
+        state = self.__dict__.copy()
+        state["_sparse"] = None
+        for name in self._LAZY_STATE:
+            if name in state:
+                state[f"_{name}_blob"] = pickle.dumps(state.pop(name), protocol=pickle.HIGHEST_PROTOCOL)
+        return state
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, i.e. lazy state not decoded yet
+        blob = self.__dict__.pop(f"_{name}_blob", None) if name in self._LAZY_STATE else None
+        if blob is None:
+            raise AttributeError(name)
+        value = _unpickle(blob)
+        setattr(self, name, value)
+        return value
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+        text = _PUNCT_RE.sub(' ', str(text).lower())
         return [w for w in text.split() if len(w) > 2]
 
-    def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+    def fit(self, documents, field_weights=None):
+        """Build the index from documents.
+
+        A document is a string, or a sequence of field strings with one entry
+        of field_weights per field. Per-field postings (term -> [(doc_id, tf)])
+        and lengths are built once; see _refresh for how they are combined.
+        """
+        with _phase("fit"):
+            self.field_weights = tuple(field_weights or (1.0,))
+            self.field_postings = [defaultdict(list) for _ in self.field_weights]
+            self.field_lengths = []
+            self._add_documents(documents)
+            self._refresh()
+
+    def append(self, documents):
+        """Add documents to a fitted index without re-tokenizing the old ones.
+
+        Only the new documents are tokenized into the per-field postings.
+        Average lengths move, so _refresh still recombines every posting, but
+        that is arithmetic on stored tfs; only terms new to the vocabulary
+        are fed into the delete index. The result equals a fresh fit.
+        """
+        with _phase("append"):
+            self._add_documents(documents)
+            self._refresh(incremental=True)
+
+    def _add_documents(self, documents):
+        """Tokenize documents into the per-field postings and lengths"""
+        tokenize, profiler, spent, calls = self.tokenize, _PROFILER, 0.0, 0
+        if profiler:
+            # Per-call phases would cost more than tokenizing; accumulate time only
+            def tokenize(text, _tokenize=self.tokenize):
+                nonlocal spent, calls
+                start = time.perf_counter()
+                tokens = _tokenize(text)
+                spent += time.perf_counter() - start
+                calls += 1
+                return tokens
+
+        for doc in documents:
+            fields = (doc,) if isinstance(doc, str) else doc
+            doc_id = len(self.field_lengths)
+            lengths = []
+            for postings, text in zip(self.field_postings, fields):
+                tokens = tokenize(text)
+                lengths.append(len(tokens))
+                term_freqs = defaultdict(int)
+                for word in tokens:
+                    term_freqs[word] += 1
+                for word, tf in term_freqs.items():
+                    postings[word].append((doc_id, tf))
+            self.field_lengths.append(tuple(lengths) + (0,) * (len(self.field_weights) - len(lengths)))
+        if profiler:
+            profiler.add("tokenize", spent * 1000, calls)
+
+    def _refresh(self, incremental=False):
+        """Derive statistics and scoring postings from the per-field data.
+
+        BM25F: each field's tf is length-normalized against that field's
+        average length and weighted, then summed into one pseudo term
+        frequency per (term, doc) that goes through the usual k1 saturation.
+        postings holds term -> [(doc_id, pseudo_tf)] sorted by doc_id.
+        incremental keeps the delete index and only adds new terms to it.
+        """
+        known_vocab, deletes = (self.vocab, self.deletes) if incremental else ([], {})
+        self.N = len(self.field_lengths)
+        self.doc_lengths = [sum(lengths) for lengths in self.field_lengths]
+        self.postings, self.doc_freqs, self.idf = {}, {}, {}
+        self.vocab, self.deletes = [], {}
+        self._sparse = None
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
+        self.avgdl = sum(self.doc_lengths) / self.N or 1
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+        combined = defaultdict(dict)
+        for f, (weight, postings) in enumerate(zip(self.field_weights, self.field_postings)):
+            avg = sum(lengths[f] for lengths in self.field_lengths) / self.N or 1
+            factors = [weight / (1 - self.b + self.b * lengths[f] / avg) for lengths in self.field_lengths]
+            for word, docs in postings.items():
+                acc = combined[word]
+                for doc_id, tf in docs:
+                    acc[doc_id] = acc.get(doc_id, 0.0) + tf * factors[doc_id]
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+        for word, acc in combined.items():
+            self.postings[word] = sorted(acc.items())
+            self.doc_freqs[word] = len(acc)
+            self.idf[word] = log((self.N - len(acc) + 0.5) / (len(acc) + 0.5) + 1)
 
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        # Fuzzy layer: sorted vocabulary for prefix lookups, delete index for typos
+        self.vocab = sorted(self.postings)
+        known = set(known_vocab)
+        for word in self.vocab:
+            if word in known:
+                continue
+            for variant in _deletes(word[:FUZZY_PREFIX_LEN], FUZZY_MAX_DISTANCE):
+                # "\0"-joined words, not lists: most variants map to one word and
+                # strings unpickle about twice as fast
+                words = deletes.get(variant)
+                deletes[variant] = f"{words}\0{word}" if words else word
+        self.deletes = deletes
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+    def expand(self, token):
+        """Vocabulary terms for an unknown token as [(term, weight)].
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+        Prefix matches win ("neumorph" -> "neumorphism"); otherwise candidates
+        sharing a delete variant with the token ("tailwnd" -> "tailwind") are
+        verified with a real edit distance (1 below 8 chars, 2 from 8) and the
+        closest ones kept. Only a bisect and a handful of dict lookups, never
+        a scan of the whole vocabulary.
+        """
+        if len(token) < FUZZY_MIN_LEN:
+            return []
+        import bisect
+        prefixed = []
+        i = bisect.bisect_left(self.vocab, token)
+        while i < len(self.vocab) and self.vocab[i].startswith(token):
+            prefixed.append(self.vocab[i])
+            i += 1
+        if prefixed:
+            best = sorted(prefixed, key=lambda w: (-self.doc_freqs[w], len(w), w))
+            return [(word, FUZZY_WEIGHTS[0]) for word in best[:FUZZY_MAX_EXPANSIONS]]
 
-            scores.append((idx, score))
+        # Short words are too close to each other to correct safely
+        max_distance = 0 if len(token) < 5 else 1 if len(token) < 8 else FUZZY_MAX_DISTANCE
+        if max_distance == 0:
+            return []
+        candidates = set()
+        for variant in _deletes(token[:FUZZY_PREFIX_LEN], max_distance):
+            words = self.deletes.get(variant)
+            if words:
+                candidates.update(words.split("\0"))
+        scored = []
+        for word in candidates:
+            distance = _edit_distance(token, word, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -self.doc_freqs[word], word))
+        if not scored:
+            return []
+        scored.sort()
+        closest = scored[0][0]
+        return [(word, FUZZY_WEIGHTS[distance]) for distance, _, word in scored[:FUZZY_MAX_EXPANSIONS]
+                if distance == closest]
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+    def query_terms(self, query):
+        """(term, weight) pairs for a query: exact tokens at 1.0, unknown ones expanded"""
+        return [term for token in self.tokenize(query) for term in self._token_terms(token)]
 
+    def _token_terms(self, token):
+        return [(token, 1.0)] if token in self.postings else self.expand(token)
 
-# ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
+    def score(self, query, top_k=None, candidates=None):
+        """Score documents containing at least one query token.
 
+        Returns (doc_id, score) pairs sorted by score (ties keep document
+        order); with top_k, only the best top_k are selected via a heap.
+        candidates (a row bitmap, see FilterBitmaps) restricts scoring to
+        those documents: a term's postings are bisected per candidate when
+        the candidates are few, otherwise filtered through a flag array.
+        """
+        scores = defaultdict(float)
+        k1 = self.k1
+        k1_plus = k1 + 1
+        if candidates is not None:
+            count = bin(candidates).count("1")
+            ids = flags = None
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
+        for term, weight in self.query_terms(query):
+            idf = self.idf[term] * weight
+            postings = self.postings[term]
+            if candidates is not None:
+                if count * 8 < len(postings):
+                    ids = ids if ids is not None else _bit_ids(candidates)
+                    postings = _postings_for(postings, ids)
+                else:
+                    flags = flags if flags is not None else _bit_flags(candidates, self.N)
+                    for doc_id, tf in postings:
+                        if flags[doc_id]:
+                            scores[doc_id] += idf * tf * k1_plus / (tf + k1)
+                    continue
+            for doc_id, tf in postings:
+                scores[doc_id] += idf * tf * k1_plus / (tf + k1)
+
+        rank_key = lambda item: (item[1], -item[0])
+        if top_k is None or len(scores) < 1000:
+            # nlargest is defined as this slice; a heap only pays off on large hit sets
+            return sorted(scores.items(), key=rank_key, reverse=True)[:top_k]
+        import heapq
+        return heapq.nlargest(top_k, scores.items(), key=rank_key)
+
+    def score_batch(self, queries, top_k=None):
+        """Score many queries at once; returns one score() style list per query.
+
+        With NumPy the whole batch is one sparse query x term-document product
+        (see _SparseBM25); without it, this is score() in a loop.
+        """
+        if self.N and _numpy() is not None:
+            if self._sparse is None:
+                self._sparse = _SparseBM25(self)
+            return self._sparse.score_batch(queries, top_k)
+        return [self.score(query, top_k) for query in queries]
+
+    def max_score(self, query):
+        """Upper bound of score() for this query in this corpus.
+
+        Each term of query_terms() contributes idf * weight * (k1 + 1), the
+        limit as tf grows, so fuzzy expansions are bounded like score() counts
+        them; tokens with no matching term count as the rarest possible term,
+        so a corpus that cannot match part of the query gets a lower ceiling.
+        """
+        if self.N == 0:
+            return 0
+        rarest = log((self.N - 0.5) / 1.5 + 1)
+        bound = 0.0
+        for token in self.tokenize(query):
+            terms = self._token_terms(token)
+            bound += sum(self.idf[term] * weight for term, weight in terms) if terms else rarest
+        return bound * (self.k1 + 1)
+
+
+def _postings_for(postings, ids):
+    """The (doc_id, tf) entries of doc_id-sorted postings whose doc is in sorted ids"""
+    import bisect
+    found, lo = [], 0
+    for doc_id in ids:
+        lo = bisect.bisect_left(postings, (doc_id,), lo)
+        if lo == len(postings):
+            break
+        if postings[lo][0] == doc_id:
+            found.append(postings[lo])
+    return found
+
+
+# Row bitmaps are Python ints (bit i = row i); these convert them in C-speed string ops
+_FLAG_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _bit_flags(mask, n):
+    """bytearray of n 0/1 flags, flags[i] = bit i of mask"""
+    return bytearray(bin(mask)[:1:-1].encode("ascii").translate(_FLAG_BYTES)[:n].ljust(n, b"\0"))
+
+
+def _bit_ids(mask):
+    """Sorted indexes of the set bits of mask"""
+    bits, ids = bin(mask)[:1:-1], []
+    i = bits.find("1")
+    while i >= 0:
+        ids.append(i)
+        i = bits.find("1", i + 1)
+    return ids
+
+
+def _mask_of(ids, n):
+    """Bitmap with the bits of ids set (inverse of _bit_ids)"""
+    flags = bytearray(n)
+    for i in ids:
+        flags[i] = 1
+    return int(flags[::-1].translate(bytes.maketrans(b"\x00\x01", b"01")) or b"0", 2)
+
+
+def _deletes(word, max_distance):
+    """Every string reachable from word by deleting up to max_distance chars (word included)"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(a, b, limit):
+    """Optimal string alignment distance (Damerau-Levenshtein with adjacent swaps), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+# ============ NUMPY BATCH ENGINE ============
+_NUMPY = False  # False = not probed yet, None = unavailable
+
+
+def _numpy():
+    """Import NumPy on first use so single queries never pay for it"""
+    global _NUMPY
+    if _NUMPY is False:
+        _NUMPY = None
+        if ENGINE != "python":
+            try:
+                import numpy
+                _NUMPY = numpy
+            except ImportError:
+                pass
+    return _NUMPY
+
+
+class _SparseBM25:
+    """Term-major CSR matrix of precomputed BM25 weights for one fitted BM25.
+
+    Row t holds idf * tf * (k1 + 1) / (tf + k1) for every document containing
+    term t, so a query's scores are the sum of its terms' rows. A batch of
+    queries is expanded to (query, doc, weight) triples and summed per cell
+    with one bincount, i.e. the product of a sparse query matrix with this
+    matrix, without ever materializing a dense queries x docs block.
+    """
+
+    def __init__(self, bm25):
+        np = _numpy()
+        self.bm25 = bm25
+        self.term_ids = {term: i for i, term in enumerate(bm25.postings)}
+        lengths = np.fromiter(map(len, bm25.postings.values()), dtype=np.int64, count=len(bm25.postings))
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        pairs = np.fromiter(chain.from_iterable(chain.from_iterable(bm25.postings.values())),
+                            dtype=np.float64, count=2 * int(self.indptr[-1])).reshape(-1, 2)
+        self.doc_ids = pairs[:, 0].astype(np.int64)
+        tf = pairs[:, 1]
+        idf = np.repeat(np.fromiter((bm25.idf[term] for term in bm25.postings), dtype=np.float64,
+                                    count=len(bm25.postings)), lengths)
+        # Same operation order as BM25.score so both engines agree bit for bit
+        self.weights = idf * tf * (bm25.k1 + 1) / (tf + bm25.k1)
+
+    def score_batch(self, queries, top_k=None):
+        np = _numpy()
+        rows, terms, term_weights = [], [], []
+        for qi, query in enumerate(queries):
+            for term, weight in self.bm25.query_terms(query):
+                rows.append(qi)
+                terms.append(self.term_ids[term])
+                term_weights.append(weight)
+        if not rows:
+            return [[] for _ in queries]
+
+        # Expand every (query, term) pair into that term's CSR row
+        rows = np.array(rows, dtype=np.int64)
+        terms = np.array(terms, dtype=np.int64)
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+        weights = self.weights[positions]
+        if any(weight != 1.0 for weight in term_weights):
+            weights = weights * np.repeat(np.array(term_weights), lengths)
+
+        # Sum weights per (query, doc) cell: the sparse query x term-document product
+        n_docs = self.bm25.N
+        cells, inverse = np.unique(np.repeat(rows, lengths) * n_docs + self.doc_ids[positions],
+                                   return_inverse=True)
+        values = np.bincount(inverse, weights=weights)
+        qi, di = np.divmod(cells, n_docs)
+
+        # Per query: score descending, ties by document order (same as BM25.score).
+        # Cells arrive sorted by (query, doc), so a stable sort on score gives each
+        # cell a global rank that already breaks ties by doc; one integer sort on
+        # (query, rank) then groups queries (much faster than a 3-key lexsort).
+        by_score = np.argsort(-values, kind="stable")
+        rank = np.empty_like(by_score)
+        rank[by_score] = np.arange(len(by_score))
+        order = np.argsort(qi * len(rank) + rank)
+        qi, di, values = qi[order], di[order], values[order]
+        counts = np.bincount(qi, minlength=len(queries))
+        if top_k is not None:
+            position = np.arange(len(qi)) - np.repeat(np.cumsum(counts) - counts, counts)
+            keep = position < top_k
+            di, values = di[keep], values[keep]
+            counts = np.minimum(counts, top_k)
+
+        di, values = di.tolist(), values.tolist()
+        ranked, start = [], 0
+        for end in np.cumsum(counts).tolist():
+            ranked.append(list(zip(di[start:end], values[start:end])))
+            start = end
+        return ranked
+
+
+# ============ SEMANTIC RERANK ============
+class LSAVectors:
+    """Latent semantic vectors of one fitted BM25, stored as raw float32 bytes.
+
+    docs holds one L2-normalized row per document, terms one projection row
+    per vocabulary term (in bm25.postings order). Plain bytes keep the index
+    pickle loadable without NumPy; np.frombuffer views them without copying.
+    """
+
+    __slots__ = ("dims", "docs", "terms")
+
+    def __init__(self, dims, docs, terms):
+        self.dims = dims
+        self.docs = docs
+        self.terms = terms
+
+    def similarities(self, bm25, query, doc_ids):
+        """Cosine between the folded-in query and each of doc_ids (0 for no overlap)"""
+        np = _numpy()
+        sparse = bm25._sparse
+        if sparse is None:
+            sparse = bm25._sparse = _SparseBM25(bm25)
+        terms = np.frombuffer(self.terms, dtype=np.float32).reshape(-1, self.dims)
+        docs = np.frombuffer(self.docs, dtype=np.float32).reshape(-1, self.dims)
+
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for term, weight in bm25.query_terms(query):
+            vector += terms[sparse.term_ids[term]] * np.float32(weight * bm25.idf[term])
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return [0.0] * len(doc_ids)
+        return (docs[np.asarray(doc_ids, dtype=np.int64)] @ (vector / norm)).tolist()
+
+
+def _fit_lsa(bm25, dims=LSA_DIMS):
+    """Truncated SVD of the BM25-weighted doc x term matrix (randomized).
+
+    Halko et al.: a Gaussian sketch with two power iterations finds the top
+    subspace, then a small dense SVD finishes. The sparse products run one
+    output column at a time, so besides a few (docs + terms) x dims blocks
+    memory only ever holds one float per posting. Returns LSAVectors, or
+    None without NumPy or a corpus too small to project.
+    """
+    np = _numpy()
+    if np is None or min(bm25.N, len(bm25.postings)) < 2:
+        return None
+    sparse = bm25._sparse
+    if sparse is None:
+        sparse = bm25._sparse = _SparseBM25(bm25)
+    n_docs, n_terms = bm25.N, len(sparse.term_ids)
+    term_of = np.repeat(np.arange(n_terms), np.diff(sparse.indptr))
+
+    def product(matrix, transpose):
+        # A @ matrix (docs x l) or A.T @ matrix (terms x l), one bincount per column
+        size = n_terms if transpose else n_docs
+        src, dst = (sparse.doc_ids, term_of) if transpose else (term_of, sparse.doc_ids)
+        return np.stack([np.bincount(dst, weights=matrix[src, j] * sparse.weights, minlength=size)
+                         for j in range(matrix.shape[1])], axis=1)
+
+    width = min(dims + 10, n_docs, n_terms)
+    sketch = product(np.random.default_rng(0).standard_normal((n_terms, width)), False)
+    for _ in range(2):
+        basis = np.linalg.qr(product(np.linalg.qr(sketch)[0], True))[0]
+        sketch = product(basis, False)
+    basis = np.linalg.qr(sketch)[0]
+    u, sigma, vt = np.linalg.svd(product(basis, True).T, full_matrices=False)
+
+    keep = max(1, min(dims, int((sigma > sigma[0] * 1e-6).sum())))
+    docs = (basis @ u[:, :keep]) * sigma[:keep]
+    norms = np.linalg.norm(docs, axis=1, keepdims=True)
+    docs = np.divide(docs, norms, out=np.zeros_like(docs), where=norms > 0)
+    return LSAVectors(keep, docs.astype(np.float32).tobytes(), vt[:keep].T.astype(np.float32).tobytes())
+
+
+def _can_rerank(index):
+    return index.lsa is not None and _numpy() is not None
+
+
+def _rerank(index, query, ranked, normalizer=None):
+    """Re-order BM25 (doc_id, score) pairs by a blend with LSA cosine similarity.
+
+    The blended score is (1 - RERANK_WEIGHT) * score / normalizer +
+    RERANK_WEIGHT * max(cosine, 0). normalizer defaults to the best score,
+    which suits ranking within one CSV; federated search passes the
+    corpus' max_score() so the lexical half is comparable across CSVs.
+    Without vectors (or NumPy) the BM25 ranking is returned unchanged.
+    """
+    if not ranked or not _can_rerank(index):
+        return ranked
+    best = normalizer or ranked[0][1] or 1
+    similarities = index.lsa.similarities(index.bm25, query, [idx for idx, _ in ranked])
+    blended = [(idx, (1 - RERANK_WEIGHT) * score / best + RERANK_WEIGHT * max(sim, 0.0))
+               for (idx, score), sim in zip(ranked, similarities)]
+    blended.sort(key=lambda pair: (-pair[1], pair[0]))
+    return blended
+
+
+# ============ INDEX CACHE ============
+class RowStore:
+    """Byte offset of every CSV record; rows are only parsed when returned.
+
+    The index keeps no cell values at all: a result row is materialized by
+    seeking to its record and parsing just that record's output columns.
+    """
+
+    __slots__ = ("path", "columns", "offsets")
+
+    def __init__(self, path, header, output_cols, offsets):
+        self.path = str(path)
+        # (name, position) of the output columns present in the header
+        self.columns = [(col, header.index(col)) for col in output_cols if col in header]
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        return self.fetch([idx])[0]
+
+    def fetch(self, ids):
+        """Output-column dicts for the given row ids, in the given order"""
+        with _phase("project"), open(self.path, 'rb') as f:
+            return [self._project(_read_record(f, self.offsets[idx])) for idx in ids]
+
+    def _project(self, record):
+        return {col: record[pos] if pos < len(record) else "" for col, pos in self.columns}
+
+
+class KeyIndex:
+    """Normalized cell value -> row ids for one key column.
+
+    Cells are split into parts on ',', '+' and '/' ("Glassmorphism + Flat
+    Design" gives two keys), so multi-valued cells are found by any part.
+    """
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self, values):
+        table = {}
+        for idx, value in enumerate(values):
+            for key in _link_keys(value):
+                ids = table.setdefault(key, [])
+                if not ids or ids[-1] != idx:
+                    ids.append(idx)
+        self.keys = sorted(table)
+        self.ids = [table[key] for key in self.keys]
+
+    def add(self, idx, value):
+        """Index one more row; idx must be above every row id already indexed"""
+        import bisect
+        for key in _link_keys(value):
+            pos = bisect.bisect_left(self.keys, key)
+            if pos < len(self.keys) and self.keys[pos] == key:
+                if self.ids[pos][-1] != idx:
+                    self.ids[pos].append(idx)
+            else:
+                self.keys.insert(pos, key)
+                self.ids.insert(pos, [idx])
+
+    def get(self, key):
+        """Row ids for an exact key, else for keys extending it by whole words"""
+        import bisect
+        pos = bisect.bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return list(self.ids[pos])
+        found, prefix = [], key + " "
+        while pos < len(self.keys) and self.keys[pos].startswith(prefix):
+            found.extend(idx for idx in self.ids[pos] if idx not in found)
+            pos += 1
+        return found
+
+    def lookup(self, key):
+        """get(), dropping trailing words of the key until something matches"""
+        words = key.split()
+        while words:
+            found = self.get(" ".join(words))
+            if found:
+                return found
+            words.pop()
         return []
 
-    data = _load_csv(filepath)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+class FilterBitmaps:
+    """Normalized value part -> bitmap of the rows holding it, for one filter column.
+
+    Parts are split and normalized like KeyIndex keys. A filter value
+    matches a part exactly or as its leading words ("good" matches "good
+    video"), and rows whose cell is "All" match every value.
+    """
+
+    __slots__ = ("keys", "masks")
+
+    def __init__(self, values):
+        table = {}
+        for idx, value in enumerate(values):
+            for key in _link_keys(value):
+                table.setdefault(key, []).append(idx)
+        self.keys = sorted(table)
+        self.masks = [_mask_of(table[key], len(values)) for key in self.keys]
+
+    def add(self, idx, value):
+        import bisect
+        for key in _link_keys(value):
+            pos = bisect.bisect_left(self.keys, key)
+            if pos < len(self.keys) and self.keys[pos] == key:
+                self.masks[pos] |= 1 << idx
+            else:
+                self.keys.insert(pos, key)
+                self.masks.insert(pos, 1 << idx)
+
+    def get(self, key):
+        import bisect
+        mask, prefix = 0, key + " "
+        pos = bisect.bisect_left(self.keys, key)
+        while pos < len(self.keys) and (self.keys[pos] == key or self.keys[pos].startswith(prefix)):
+            mask |= self.masks[pos]
+            pos += 1
+        return mask
+
+    def match(self, values):
+        """Bitmap of rows matching any of the (normalized) values"""
+        mask = self.get("all")
+        for value in values:
+            mask |= self.get(value)
+        return mask
+
+
+def _link_keys(value):
+    """Lookup keys of a cell: lower-cased parts with punctuation folded to spaces"""
+    keys = (" ".join(re.sub(r'[^\w]+', ' ', part.lower()).split()) for part in re.split(r'[,+/]', value))
+    return [key for key in keys if key]
+
+
+class SearchIndex:
+    """Fitted BM25 index plus a lazy RowStore, KeyIndex tables and FilterBitmaps over one CSV"""
+
+    def __init__(self, bm25, rows, keys=None, filters=None):
+        self.bm25 = bm25
+        self.rows = rows
+        self.keys = keys or {}  # key column -> KeyIndex
+        self.filters = filters or {}  # _filter_name(filter column) -> FilterBitmaps
+        self.lsa = None  # LSAVectors, computed on the first rerank (see semantic_index)
+
+
+def _scan_csv(filepath, start=0):
+    """Yield (byte offset, fields) for every non-empty record from byte `start` on.
+
+    From 0 the first record is the header; a later start must be a record boundary.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        consumed = start
+
+        def lines():
+            nonlocal consumed
+            for line in f:
+                consumed += len(line)
+                yield line.decode('utf-8')
+
+        # csv.reader pulls lines lazily, so `consumed` is the end of the last record
+        for record in csv.reader(lines()):
+            if record:
+                yield start, record
+            start = consumed
+
+
+def _read_record(f, offset):
+    """Parse the single CSV record starting at a byte offset of an open binary file"""
+    f.seek(offset)
+    return next(csv.reader(line.decode('utf-8') for line in iter(f.readline, b'')), [])
+
+
+# In-process memo: cache path -> (stat fingerprint, SearchIndex)
+_INDEXES = {}
+
+
+def _stat_key(filepath):
+    """Cheap change detector: (size, mtime_ns)"""
+    st = os.stat(filepath)
+    return st.st_size, st.st_mtime_ns
+
+
+def _content_hash(filepath):
+    """SHA-1 of the raw CSV bytes"""
+    import hashlib
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _appended_to(filepath, size, sha1):
+    """Byte offset of the records appended to a file of `size` bytes hashing to `sha1`, else None.
+
+    The appended bytes must start at a record boundary: either the old
+    content ends with a newline, or (for a CSV saved without a trailing
+    newline) the appender's first byte is the line break that completes
+    the old last record. Anything else (edits, truncation, a grown last
+    line) is not an append.
+    """
+    if os.path.getsize(filepath) <= size or size == 0:
+        return None
+    import hashlib
+    with open(filepath, 'rb') as f:
+        prefix = f.read(size)
+        follow = f.read(2)
+    if hashlib.sha1(prefix).hexdigest() != sha1:
+        return None
+    if prefix.endswith(b"\n"):
+        return size
+    for newline in (b"\n", b"\r\n"):
+        if follow.startswith(newline):
+            return size + len(newline)
+    return None
+
+
+def _cache_path(filepath, config):
+    """Cache file name, unique per CSV path and column layout/weights"""
+    weights = config.get("weights", {})
+    key = "\0".join([str(Path(filepath).resolve())] +
+                    [f"{col}={weights.get(col, 1.0)}" for col in config["search_cols"]] +
+                    ["|"] + list(config["output_cols"]) + ["|"] + list(config.get("keys", ())) +
+                    ["|"] + list(config.get("filters", ())))
+    digest = f"{zlib.crc32(key.encode('utf-8')):08x}"  # zlib loads faster than hashlib
+    return CACHE_DIR / f"{Path(filepath).stem}-{digest}.idx"
+
+
+def _read_rows(filepath, config, start=0):
+    """Header, per-record search fields, key/filter values and byte offsets of a CSV.
+
+    Each record's values list holds its config["keys"] cells followed by its
+    config["filters"] cells. start skips to a byte offset (a record boundary
+    after the header) and only returns the records from there on.
+    """
+    columns = config["search_cols"] + config.get("keys", []) + config.get("filters", [])
+    split = len(config["search_cols"])
+
+    # One field per search column, followed by the key and filter column values
+    documents, values, offsets = [], [], array('q')
+    with _phase("csv_read"):
+        records = _scan_csv(filepath)
+        header = next(records, (0, []))[1]
+        if start:
+            records.close()
+            records = _scan_csv(filepath, start)
+        positions = [header.index(col) if col in header else None for col in columns]
+        for offset, record in records:
+            offsets.append(offset)
+            cells = [record[pos] if pos is not None and pos < len(record) else "" for pos in positions]
+            documents.append(cells[:split])
+            values.append(cells[split:])
+    return header, documents, values, offsets
+
+
+def _build_index(filepath, config):
+    """Scan CSV once: fit BM25F on the search columns, record row offsets, key tables and filter bitmaps"""
+    weights = config.get("weights", {})
+    header, documents, values, offsets = _read_rows(filepath, config)
 
-    # BM25 search
     bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+    bm25.fit(documents, [weights.get(col, 1.0) for col in config["search_cols"]])
+    key_cols = config.get("keys", [])
+    keys = {col: KeyIndex([cells[i] for cells in values]) for i, col in enumerate(key_cols)}
+    filters = {_filter_name(col): FilterBitmaps([cells[i] for cells in values])
+               for i, col in enumerate(config.get("filters", []), len(key_cols)) if col in header}
+    return SearchIndex(bm25, RowStore(filepath, header, config["output_cols"], offsets), keys, filters)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
 
-    return results
+def _append_index(index, filepath, config, start):
+    """Extend an index of the CSV's first `start` bytes with the records after them"""
+    header, documents, values, offsets = _read_rows(filepath, config, start)
+    base = len(index.rows)
+    index.bm25.append(documents)
+    index.lsa = None
+    index.rows.offsets.extend(offsets)
+    key_cols = config.get("keys", [])
+    tables = [(index.keys[col], i) for i, col in enumerate(key_cols)]
+    tables += [(index.filters[_filter_name(col)], i)
+               for i, col in enumerate(config.get("filters", []), len(key_cols)) if col in header]
+    for table, i in tables:
+        for idx, cells in enumerate(values, base):
+            table.add(idx, cells[i])
+    return index
+
+
+def _read_cache(path):
+    """Return the cached entry dict, or None if missing/corrupt/outdated"""
+    try:
+        # Read through the open file: a concurrent os.replace swaps the name, never the bytes we read.
+        # Large files are mapped read-only rather than copied into memory first
+        with _phase("cache_read"), open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < CACHE_MMAP_MIN_BYTES:
+                entry = _unpickle(f.read())
+            else:
+                import mmap
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    entry = _unpickle(view)
+    except (OSError, EOFError, UnpicklingError, AttributeError, ImportError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != INDEX_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(path, entry):
+    """Atomically write a cache entry; failures only cost a rebuild next time"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            import pickle
+            with _phase("cache_write"), os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
+
+
+def _file_id(path):
+    """(inode, size, mtime_ns) of a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+@contextmanager
+def _cache_lock(path):
+    """Hold an exclusive flock on "<cache file>.lock" for the block.
+
+    Serializes building and writing one cache file across processes. The
+    lock file is never removed (a deleted lock file lets two processes
+    lock different inodes). Without fcntl (Windows) or a writable cache
+    dir, the block runs unlocked and concurrent builds just race as before.
+    """
+    try:
+        import fcntl
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    except (ImportError, OSError):
+        yield
+        return
+    try:
+        with _phase("lock_wait"):
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except OSError:  # e.g. a filesystem without flock support
+                pass
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def _refresh_entry(entry, filepath, config, size, mtime_ns):
+    """Cache entry for the CSV's current state, reusing, extending or rebuilding entry's index"""
+    digest = _content_hash(filepath)
+    start = _appended_to(filepath, entry["size"], entry["sha1"]) if entry else None
+    if entry and entry["size"] == size and entry["sha1"] == digest:
+        index = entry["index"]
+    elif start is not None:
+        index = _append_index(entry["index"], filepath, config, start)
+    else:
+        index = _build_index(filepath, config)
+    return {"version": INDEX_VERSION, "size": size, "mtime_ns": mtime_ns, "sha1": digest, "index": index}
+
+
+def load_index(filepath, config):
+    """Return a SearchIndex for a CSV and its search config, reusing the in-process or on-disk cache.
+
+    The disk cache is keyed on the CSV's size, mtime and SHA-1: a size/mtime
+    match is trusted as-is, otherwise the content hash decides whether the
+    cached index is still valid (e.g. after a checkout that only touched mtime).
+    When the cached bytes are an unchanged prefix of the CSV, only the
+    appended records are parsed and added; any other change rebuilds.
+    Rebuilds happen under a per-file lock (_cache_lock), so processes
+    starting cold together build each index once and load the winner's.
+    """
+    filepath = Path(filepath)
+    path = _cache_path(filepath, config)
+    size, mtime_ns = _stat_key(filepath)
+
+    memo = _INDEXES.get(path)
+    if memo and memo[0] == (size, mtime_ns):
+        return memo[1]
+
+    if not CACHE_ENABLED:
+        entry = _refresh_entry(None, filepath, config, size, mtime_ns)
+    else:
+        seen = _file_id(path)
+        entry = _read_cache(path)
+        if not (entry and (entry["size"], entry["mtime_ns"]) == (size, mtime_ns)):
+            # Single builder: the lock holder builds and writes, the others wait and then
+            # read its result instead of building the same index again
+            with _cache_lock(path):
+                if _file_id(path) != seen:
+                    entry = _read_cache(path)
+                if not (entry and (entry["size"], entry["mtime_ns"]) == (size, mtime_ns)):
+                    entry = _refresh_entry(entry, filepath, config, size, mtime_ns)
+                    _write_cache(path, entry)
+
+    _INDEXES[path] = ((size, mtime_ns), entry["index"])
+    return entry["index"]
+
+
+def semantic_index(filepath, config):
+    """load_index, plus LSA vectors for reranking when NumPy is available.
+
+    Vectors are fitted on first use and written back into the disk cache
+    entry the index came from, so later processes load them with it.
+    """
+    index = load_index(filepath, config)
+    if index.lsa is None and _numpy() is not None:
+        with _phase("lsa_fit"):
+            index.lsa = _fit_lsa(index.bm25)
+        path = _cache_path(filepath, config)
+        if not CACHE_ENABLED:
+            return index
+        with _cache_lock(path):
+            entry = _read_cache(path)
+            memo = _INDEXES.get(path)
+            if entry and memo and memo[1] is index and (entry["size"], entry["mtime_ns"]) == memo[0] \
+                    and entry["index"].lsa is None:
+                entry["index"] = index
+                _write_cache(path, entry)
+    return index
+
+
+def _needs_build(filepath, config):
+    """Neither the memo nor (judging by mtimes) the disk cache can serve this CSV"""
+    path = _cache_path(filepath, config)
+    memo = _INDEXES.get(path)
+    if memo and memo[0] == _stat_key(filepath):
+        return False
+    if not CACHE_ENABLED:
+        return True
+    try:
+        return os.stat(path).st_mtime_ns < os.stat(filepath).st_mtime_ns
+    except OSError:
+        return True
+
+
+def _pool_load(filepath, config):
+    """Process-pool worker: load_index in the child, hand back its memo entry"""
+    index = load_index(filepath, config)
+    return _cache_path(filepath, config), _INDEXES[_cache_path(filepath, config)][0], index
+
+
+def build_indexes(targets, workers=None):
+    """Build the missing indexes of [(filepath, config)] across a process pool.
+
+    Each worker loads (and caches to disk) one CSV; the fitted indexes are
+    merged into the in-process memo, so cold start scales with cores rather
+    than file count. Leaves the builds to load_index in this process when
+    there is at most one index to build, workers is 1, no pool can be
+    started, or the caller is not the main thread (forking a threaded
+    process can deadlock in the child).
+    """
+    pending = [(Path(filepath), config) for filepath, config in targets if _needs_build(filepath, config)]
+    workers = min(len(pending), workers or BUILD_WORKERS or os.cpu_count() or 1)
+    if workers < 2:
+        return
+    import threading
+    if threading.current_thread() is not threading.main_thread():
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, key, index in pool.map(_pool_load, *zip(*pending)):
+                _INDEXES[path] = (key, index)
+    except (OSError, RuntimeError) as exc:  # no semaphores / fork here, or a broken pool
+        _warn(f"parallel index build unavailable ({exc}), building serially")
+
+
+# ============ RESULT CACHE ============
+def _sqlite3():
+    """sqlite3 module, imported on first use (None if this Python lacks it)"""
+    try:
+        import sqlite3
+    except ImportError:
+        return None
+    return sqlite3
+
+
+class ResultCache:
+    """Bounded LRU of search results (lists of row dicts): in memory, backed by an SQLite file.
+
+    The SQLite file is shared by every process using the same CACHE_DIR;
+    its "used" column orders eviction and values are stored there as JSON
+    text. Rows are copied in and out, so every get() hands out fresh
+    objects. Database errors (read-only cache dir, lock timeouts, no
+    sqlite3) only turn into misses. With shared=False get() and put() only
+    use the in-memory LRU and never touch SQLite.
+    """
+
+    def __init__(self, path, memo_size=RESULT_MEMO_SIZE, max_entries=RESULT_CACHE_ENTRIES):
+        import _thread  # threading.Lock without importing threading on every CLI query
+        self.path = Path(path)
+        self.memo_size = memo_size
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self._db = None  # connection, or False once connecting failed
+        self._errors = (OSError,)
+        self._lock = _thread.allocate_lock()
+
+    def _connect(self):
+        if self._db is None:
+            sqlite3 = _sqlite3()
+            self._db = False
+            if sqlite3 is None:
+                return None
+            self._errors = (OSError, sqlite3.Error)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(self.path), timeout=2, isolation_level=None, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)")
+                db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+                self._db = db
+            except self._errors:
+                return None
+        return self._db or None
+
+    def _remember(self, key, rows):
+        self.memo[key] = [dict(row) for row in rows]
+        self.memo.move_to_end(key)
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+
+    def get(self, key, shared=True):
+        """Cached value for key, or None"""
+        with self._lock:
+            rows = self.memo.get(key)
+            if rows is not None:
+                self.memo.move_to_end(key)
+                return [dict(row) for row in rows]
+            db = self._connect() if shared else None
+            if db is None:
+                return None
+            try:
+                row = db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+            except self._errors:
+                return None
+            import json
+            rows = json.loads(row[0])
+            self._remember(key, rows)
+            return rows
+
+    def put(self, key, rows, shared=True):
+        with self._lock:
+            self._remember(key, rows)
+            db = self._connect() if shared else None
+            if db is None:
+                return
+            import json
+            text = json.dumps(rows, ensure_ascii=False)
+            try:
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, text, time.time()))
+                db.execute("DELETE FROM results WHERE key IN "
+                           "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            except self._errors:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self.memo.clear()
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute("DELETE FROM results")
+                except self._errors:
+                    pass
+
+
+_RESULTS = None
+
+
+def _results():
+    """The process-wide ResultCache, created on first use"""
+    global _RESULTS
+    if _RESULTS is None:
+        _RESULTS = ResultCache(CACHE_DIR / "results.sqlite")
+    return _RESULTS
+
+
+def _result_key(filepath, config, query, max_results, rerank, stat=None):
+    """Result cache key: normalized query and options plus the CSV's current size and mtime.
+
+    An edited CSV changes the key, so stale results are never returned;
+    they just age out of the LRU.
+    """
+    size, mtime_ns = stat or _stat_key(filepath)
+    rerank = bool(rerank) and _numpy() is not None  # without NumPy --rerank is plain BM25
+    parts = [INDEX_VERSION, _cache_path(filepath, config).name, size, mtime_ns,
+             " ".join(query.lower().split()), max_results, rerank]
+    return "\0".join(map(str, parts))
+
+
+# ============ SEARCH FUNCTIONS ============
+# "column:value" query filters; a value starting with "/" is left alone (URLs)
+_FILTER_RE = re.compile(r'(?<!\S)([A-Za-z][\w-]*):([^\s/]\S*)')
+
+
+def _filter_name(column):
+    """Filter key of a column: lower-cased letters and digits ("Dark Mode ✓" -> "darkmode")"""
+    return re.sub(r'[^a-z0-9]', '', column.lower())
+
+
+def _filter_keys():
+    """Filter keys of every configured filter column, plus "stack" (routing)"""
+    configs = [*CSV_CONFIG.values(), *STACK_CONFIG.values(), _STACK_COLS]
+    return {"stack"} | {_filter_name(col) for config in configs for col in config.get("filters", ())}
+
+
+def parse_filters(query):
+    """Split "column:value" tokens off a query.
+
+    Returns (remaining text, [(filter key, [normalized values])]). A value
+    may list alternatives with commas (severity:high,medium). Filters on
+    the same key are ANDed like any other pair of filters. Only keys naming
+    a configured filter column (or "stack") are filters; any other token
+    (dark:bg-slate-900, hover:scale) stays in the text and is scored.
+    """
+    filters = []
+    keys = _filter_keys()
+
+    def take(match):
+        name = _filter_name(match[1])
+        if name not in keys:
+            return match[0]
+        filters.append((name, _link_keys(match[2])))
+        return " "
+
+    text = _FILTER_RE.sub(take, query)
+    return " ".join(text.split()), filters
+
+
+def _filter_mask(index, filters):
+    """Bitmap of the rows passing every filter (a column this CSV lacks passes none)"""
+    mask = (1 << len(index.rows)) - 1
+    for name, values in filters:
+        if name == "stack":  # routing, handled by run_request
+            continue
+        table = index.filters.get(name)
+        mask &= table.match(values) if table else 0
+    return mask
+
+
+def _search_index(index, query, max_results, rerank=False, normalizer=None):
+    """Top (row, score) pairs with score > 0.
+
+    "column:value" filters in the query are resolved to a row bitmap first
+    and BM25 only scores those rows; a query of filters alone returns the
+    matching rows in file order with score 0. With rerank, the top
+    RERANK_DEPTH BM25 hits are re-ordered by _rerank (with normalizer) and
+    the scores returned are the blended ones (in [0, 1]).
+    """
+    text, filters = parse_filters(query)
+    candidates = None
+    if filters:
+        with _phase("filter"):
+            candidates = _filter_mask(index, filters)
+        if not index.bm25.tokenize(text):
+            return [(row, 0) for row in index.rows.fetch(_bit_ids(candidates)[:max_results])]
+
+    with _phase("score"):
+        ranked = index.bm25.score(text, top_k=max(max_results, RERANK_DEPTH) if rerank else max_results,
+                                  candidates=candidates)
+    hits = [(idx, score) for idx, score in ranked if score > 0]
+    if rerank:
+        with _phase("rerank"):
+            hits = _rerank(index, text, hits, normalizer)[:max_results]
+    return list(zip(index.rows.fetch([idx for idx, _ in hits]), [score for _, score in hits]))
+
+
+def _search_csv(filepath, config, query, max_results, rerank=False):
+    """Core search function using BM25F"""
+    if not filepath.exists():
+        return []
+
+    if CACHE_ENABLED:
+        stat = _stat_key(filepath)
+        # Small CSVs search faster than a cold process can open the SQLite file
+        shared = stat[0] >= RESULT_CACHE_MIN_BYTES
+        key = _result_key(filepath, config, query, max_results, rerank, stat)
+        with _phase("result_cache"):
+            rows = _results().get(key, shared)
+        if rows is not None:
+            return rows
+
+    index = semantic_index(filepath, config) if rerank else load_index(filepath, config)
+    rows = [row for row, _ in _search_index(index, query, max_results, rerank)]
+    if CACHE_ENABLED:
+        with _phase("result_cache"):
+            _results().put(key, rows, shared)
+    return rows
 
 
 def detect_domain(query):
-    """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
+    """Auto-detect the most relevant domain from query.
+
+    With "column:value" filters, only domains that have all those filter
+    columns are considered (when any domain does).
+    """
+    text, filters = parse_filters(query)
+    query_lower = " ".join([text] + [value for _, values in filters for value in values]).lower()
 
     domain_keywords = {
         "color": ["color", "palette", "hex", "#", "rgb"],
@@ -196,15 +1594,26 @@ def detect_domain(query):
         "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"]
     }
 
+    # Pack domains opt in with a "detect" keyword list
+    domain_keywords.update((domain, config["detect"]) for domain, config in CSV_CONFIG.items() if config.get("detect"))
+
     scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
+    names = {name for name, _ in filters if name != "stack"}
+    if names:
+        covering = [domain for domain, config in CSV_CONFIG.items()
+                    if names <= {_filter_name(col) for col in config.get("filters", [])}]
+        if covering:
+            return max(covering, key=lambda domain: scores.get(domain, 0))
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
+def search(query, domain=None, max_results=MAX_RESULTS, rerank=False):
     """Main search function with auto-domain detection"""
     if domain is None:
         domain = detect_domain(query)
+    if domain == "all":
+        return search_all(query, max_results, rerank=rerank)
 
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
@@ -212,7 +1621,7 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    results = _search_csv(filepath, config, query, max_results, rerank)
 
     return {
         "domain": domain,
@@ -223,7 +1632,7 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     }
 
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
+def search_stack(query, stack, max_results=MAX_RESULTS, rerank=False):
     """Search stack-specific guidelines"""
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
@@ -233,7 +1642,7 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    results = _search_csv(filepath, _stack_config(stack), query, max_results, rerank)
 
     return {
         "domain": "stack",
@@ -243,3 +1652,341 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
         "count": len(results),
         "results": results
     }
+
+
+def _search_targets(include_stacks):
+    """(source tag, filepath, search config) for every searchable CSV"""
+    targets = [(domain, DATA_DIR / config["file"], config) for domain, config in CSV_CONFIG.items()]
+    if include_stacks:
+        targets += [(f"stack:{stack}", DATA_DIR / config["file"], _stack_config(stack))
+                    for stack, config in STACK_CONFIG.items()]
+    return [target for target in targets if target[1].exists()]
+
+
+def search_all(query, max_results=MAX_RESULTS, include_stacks=False, rerank=False):
+    """Federated search over every domain (and optionally every stack).
+
+    Each CSV is queried in a thread pool; raw BM25 scores are divided by that
+    corpus' max_score() so they land in [0, 1] and can be merged into one
+    ranking. Reranked scores blend the same normalized BM25 score with the
+    cosine similarity. Rows are tagged with "_source" and "_score".
+    """
+    targets = _search_targets(include_stacks)
+    build_indexes([(filepath, config) for _, filepath, config in targets])
+
+    def run(target):
+        source, filepath, config = target
+        index = semantic_index(filepath, config) if rerank else load_index(filepath, config)
+        ceiling = index.bm25.max_score(parse_filters(query)[0]) or 1
+        hits = _search_index(index, query, max_results, rerank, normalizer=ceiling)
+        scale = 1 if rerank and _can_rerank(index) else ceiling  # blended scores are normalized already
+        return [(score / scale, source, row) for row, score in hits]
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(len(targets), os.cpu_count() or 4) or 1) as pool:
+        hits = [hit for part in pool.map(run, targets) for hit in part]
+
+    # Stable sort: equal scores keep CSV_CONFIG / STACK_CONFIG order
+    hits.sort(key=lambda hit: hit[0], reverse=True)
+    results = [{"_source": source, "_score": round(score, 4), **row} for score, source, row in hits[:max_results]]
+
+    return {
+        "domain": "all",
+        "query": query,
+        "file": f"{len(targets)} files",
+        "count": len(results),
+        "results": results
+    }
+
+
+def preload(include_stacks=True):
+    """Load (or build) every domain index, and optionally every stack index"""
+    targets = [(filepath, config) for _, filepath, config in _search_targets(include_stacks)]
+    build_indexes(targets)
+    for filepath, config in targets:
+        load_index(filepath, config)
+
+
+def prebuild():
+    """Install-time build step (search.py --build-index).
+
+    Writes every domain and stack index to the disk cache and byte-compiles
+    these scripts, so later processes load one cache file per domain they
+    touch and never compile Python source (PYTHONDONTWRITEBYTECODE or a
+    read-only skill directory would otherwise make every run do so).
+    Returns [(CSV file name, cache path)].
+    """
+    import compileall
+    preload(include_stacks=True)
+    compileall.compile_dir(str(Path(__file__).parent), maxlevels=0, quiet=1)
+    return [(filepath.name, _cache_path(filepath, config)) for _, filepath, config in _search_targets(True)]
+
+
+# ============ DESIGN SYSTEM ============
+# Links followed from the matched products.csv row: (product column, key column of the target CSV)
+DESIGN_STYLE_LINKS = [("Primary Style Recommendation", "Style Category")]
+DESIGN_COLOR_LINKS = [("Color Palette Focus", "Notes"), ("Product Type", "Product Type")]
+DESIGN_MOOD_COLS = ["Keywords"]  # product + style keywords -> typography "Mood/Style Keywords"
+
+
+def _domain_index(domain):
+    config = CSV_CONFIG[domain]
+    filepath = DATA_DIR / config["file"]
+    return load_index(filepath, config) if filepath.exists() else None
+
+
+def _follow(index, links, row, limit=None):
+    """Rows reached from `row` through the first link that resolves.
+
+    links are (column of row, key column of index) pairs tried in order;
+    each part of the link cell maps to its first KeyIndex match. When no
+    link resolves, the first link's text is looked up with BM25 on the same
+    (already loaded) index instead. Rows are tagged "_via": "key" / "search".
+    """
+    for column, key_column in links:
+        table = index.keys.get(key_column)
+        ids = []
+        for key in _link_keys(row.get(column, "")):
+            found = table.lookup(key) if table else []
+            if found and found[0] not in ids:
+                ids.append(found[0])
+        if ids:
+            return [{"_via": "key", **match} for match in index.rows.fetch(ids[:limit])]
+
+    text = row.get(links[0][0], "")
+    return [{"_via": "search", **match} for match, _ in _search_index(index, text, limit or 1)] if text else []
+
+
+def _match_moods(index, keywords, max_results):
+    """Typography rows ranked by how many of the keywords their mood keywords share"""
+    table = index.keys.get("Mood/Style Keywords")
+    counts = {}
+    for key in dict.fromkeys(keywords):
+        for idx in table.get(key) if table else ():
+            counts[idx] = counts.get(idx, 0) + 1
+    ranked = sorted(counts, key=lambda idx: (-counts[idx], idx))[:max_results]
+    return [{"_via": "key", "_matches": counts[idx], **row} for idx, row in zip(ranked, index.rows.fetch(ranked))]
+
+
+def design_system(query, stack=None, max_results=MAX_RESULTS):
+    """Product -> style -> colors -> typography (-> stack) in one call.
+
+    Only the product is found by BM25; the rest follows the links stored in
+    products.csv through the KeyIndex tables built with each index, so every
+    CSV is loaded at most once.
+    """
+    build_indexes([(DATA_DIR / CSV_CONFIG[domain]["file"], CSV_CONFIG[domain])
+                   for domain in ("product", "style", "color", "typography")
+                   if (DATA_DIR / CSV_CONFIG[domain]["file"]).exists()])
+    products = _domain_index("product")
+    if products is None:
+        return {"error": f"File not found: {DATA_DIR / CSV_CONFIG['product']['file']}"}
+    hits = _search_index(products, query, 1)
+    if not hits:
+        return {"error": f"No product matches: {query}", "domain": "design-system", "query": query}
+    product = hits[0][0]
+
+    result = {"domain": "design-system", "query": query, "product": product,
+              "style": [], "color": [], "typography": []}
+
+    styles = _domain_index("style")
+    if styles is not None:
+        result["style"] = _follow(styles, DESIGN_STYLE_LINKS, product)
+
+    colors = _domain_index("color")
+    if colors is not None:
+        result["color"] = _follow(colors, DESIGN_COLOR_LINKS, product, limit=1)
+
+    typography = _domain_index("typography")
+    if typography is not None:
+        moods = [key for row in [product] + result["style"] for col in DESIGN_MOOD_COLS
+                 for key in _link_keys(row.get(col, ""))]
+        result["typography"] = _match_moods(typography, moods, max_results)
+
+    if stack:
+        # Stack guidelines are generic; the style names give the query something to match
+        names = " ".join(row.get("Style Category", "") for row in result["style"])
+        result["stack"] = search_stack(f"{query} {names}".strip(), stack, max_results)
+    return result
+
+
+def _stack_filter(query):
+    """Stack named by a "stack:<name>" filter in the query, if any"""
+    names = {_filter_name(stack): stack for stack in STACK_CONFIG}
+    for name, values in parse_filters(query)[1]:
+        if name == "stack" and values:
+            return names.get(_filter_name(values[0]), values[0])
+    return None
+
+
+def _project(row, keep):
+    return {key: value for key, value in row.items() if key.startswith("_") or _filter_name(key) in keep}
+
+
+def select_fields(result, fields):
+    """Keep only the named output columns in every row of a result.
+
+    Names match like filter keys ("dark mode" selects "Dark Mode ✓");
+    "_"-prefixed bookkeeping keys are always kept. Design-system results
+    are projected section by section.
+    """
+    keep = {_filter_name(field) for field in fields} - {""}
+    if not keep or "error" in result:
+        return result
+    result = dict(result)
+    for key in ("results", "style", "color", "typography"):
+        if key in result:
+            result[key] = [_project(row, keep) for row in result[key]]
+    if isinstance(result.get("product"), dict):
+        result["product"] = _project(result["product"], keep)
+    if isinstance(result.get("stack"), dict):
+        result["stack"] = select_fields(result["stack"], fields)
+    return result
+
+
+def _request_fields(request):
+    """Field names of a request's "fields" entry (list or comma-separated string)"""
+    fields = request.get("fields") or []
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [str(field) for field in fields]
+
+
+# Types accepted for the optional request fields that are used as names or keys
+_REQUEST_TYPES = {"domain": (str,), "stack": (str,), "fields": (str, list)}
+
+
+def _max_results(request):
+    """A request's result limit; absent or 0 means MAX_RESULTS, None if malformed"""
+    value = request.get("max_results") or MAX_RESULTS
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        return None
+    return value
+
+
+def _request_error(request):
+    """Error message for a request dict that cannot be answered, else None"""
+    query = request.get("query")
+    if not isinstance(query, str) or not query.strip():
+        return "Missing query"
+    for key, types in _REQUEST_TYPES.items():
+        if request.get(key) is not None and not isinstance(request[key], types):
+            return f"Bad request: {key} must be {' or '.join(t.__name__ for t in types)}"
+    if _max_results(request) is None:
+        return "Bad request: max_results must be a non-negative integer"
+    return None
+
+
+def run_request(request):
+    """Answer one request dict: {"query", "domain"?, "stack"?, "max_results"?, "design_system"?, "rerank"?, "fields"?}"""
+    error = _request_error(request)
+    if error:
+        return {"error": error}
+    fields = _request_fields(request)
+    result = _answer(request)
+    return select_fields(result, fields) if fields else result
+
+
+def _answer(request):
+    query = request["query"]
+    max_results = _max_results(request)
+
+    rerank = bool(request.get("rerank"))
+    if request.get("design_system"):
+        return design_system(query, request.get("stack"), max_results)
+    # Stack search takes priority; a "stack:<name>" filter in the query selects one too
+    stack = request.get("stack") or _stack_filter(query)
+    if stack:
+        return search_stack(query, stack, max_results, rerank)
+    if request.get("domain") == "all":
+        return search_all(query, max_results, include_stacks=bool(request.get("include_stacks")), rerank=rerank)
+    return search(query, request.get("domain"), max_results, rerank)
+
+
+# Requests grouped per scoring pass in run_batch; bounds memory and output latency
+BATCH_CHUNK = 512
+
+
+def _batch_target(request):
+    """(filepath, search config, result header) for a plain single-CSV request.
+
+    Returns None for anything run_request should answer itself: invalid
+    requests (answered with a per-request error), unknown stacks, missing
+    files, federated "all" searches and requests needing per-query work
+    (filters, rerank, design systems).
+    """
+    if "error" in request or _request_error(request) or request.get("design_system") \
+            or request.get("rerank") or _FILTER_RE.search(request["query"]):
+        return None
+    query = request["query"]
+
+    stack = request.get("stack")
+    if stack:
+        if stack not in STACK_CONFIG:
+            return None
+        file = STACK_CONFIG[stack]["file"]
+        header = {"domain": "stack", "stack": stack, "query": query, "file": file}
+        config = _stack_config(stack)
+    else:
+        domain = request.get("domain") or detect_domain(query)
+        if domain == "all":
+            return None
+        config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+        file = config["file"]
+        header = {"domain": domain, "query": query, "file": file}
+
+    filepath = DATA_DIR / file
+    if not filepath.exists():
+        return None
+    return filepath, config, header
+
+
+def _run_chunk(requests):
+    results = [None] * len(requests)
+    groups = {}  # filepath -> (config, [(request index, result header)])
+    for i, request in enumerate(requests):
+        target = _batch_target(request)
+        if target is None:
+            results[i] = {"error": request["error"]} if "error" in request else run_request(request)
+        else:
+            filepath, config, header = target
+            groups.setdefault(filepath, (config, []))[1].append((i, header))
+
+    for filepath, (config, items) in groups.items():
+        index = load_index(filepath, config)
+        limits = [_max_results(requests[i]) for i, _ in items]
+        with _phase("score"):
+            ranked = index.bm25.score_batch([header["query"] for _, header in items], top_k=max(limits))
+        for (i, header), limit, hits in zip(items, limits, ranked):
+            rows = index.rows.fetch([idx for idx, score in hits[:limit] if score > 0])
+            results[i] = {**header, "count": len(rows), "results": rows}
+            fields = _request_fields(requests[i])
+            if fields:
+                results[i] = select_fields(results[i], fields)
+
+    for request, result in zip(requests, results):
+        if "id" in request:
+            result["id"] = request["id"]
+    return results
+
+
+def run_batch(requests):
+    """Answer an iterable of request dicts, yielding results in input order.
+
+    Requests that hit the same CSV share one loaded index and are scored
+    together with BM25.score_batch; results are produced chunk by chunk so
+    output streams while input is still being read. A request's "id" is
+    echoed back, and requests carrying an "error" (e.g. undecodable input
+    lines) are answered with that error.
+    """
+    chunk = []
+    for request in requests:
+        chunk.append(request)
+        if len(chunk) >= BATCH_CHUNK:
+            yield from _run_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _run_chunk(chunk)
+
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Server - keeps every index warm and answers NDJSON queries
+Protocol: one JSON request per line ({"query", "domain", "stack", "max_results"}),
+one JSON result per line, over stdin/stdout or a Unix domain socket.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+import core
+from core import SOCKET_PATH, run_request
+
+CLIENT_TIMEOUT = 5
+
+
+def _answer(line):
+    """Decode one request line and return the encoded response line"""
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        result = run_request(request)
+    except (TypeError, ValueError) as exc:
+        result = {"error": f"Bad request: {exc}"}
+    return json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def preload():
+    """Warm every index with the process pool, then build serially for the server's lifetime"""
+    core.preload()
+    core.BUILD_WORKERS = 1
+
+
+def serve_stdio():
+    """Answer requests from stdin until EOF"""
+    preload()
+    for line in sys.stdin:
+        if line.strip():
+            sys.stdout.write(_answer(line))
+            sys.stdout.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(_answer(line.decode("utf-8")).encode("utf-8"))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _server_alive(path):
+    """True if something is accepting connections on the socket path"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def serve_socket(path=SOCKET_PATH):
+    """Answer requests on a Unix domain socket until interrupted"""
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("Unix domain sockets are not supported here; use --serve --stdio")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if _server_alive(path):
+            raise SystemExit(f"A server is already listening on {path}")
+        path.unlink()
+
+    preload()
+    server = _Server(str(path), _Handler)
+    print(f"UI Pro Max server listening on {path}", file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def forward(request, path=SOCKET_PATH):
+    """Send a request to a running server; None if no server is reachable"""
+    if not hasattr(socket, "AF_UNIX") or not Path(path).exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
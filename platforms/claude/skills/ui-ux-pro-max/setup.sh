@@ -1,6 +1,7 @@
 #!/bin/bash
 set -euo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 NEED_MANUAL=0
 
 echo "[ui-ux-pro-max] 检查 Python3..."
@@ -19,3 +20,10 @@ fi
 if [ "$NEED_MANUAL" -eq 1 ]; then
   exit 2
 fi
+
+echo "[ui-ux-pro-max] 预构建检索索引..."
+if python3 "$SCRIPT_DIR/scripts/search.py" --build-index >/dev/null; then
+  echo "[ui-ux-pro-max] 索引已写入缓存目录"
+else
+  echo "[ui-ux-pro-max] 索引预构建失败，首次检索时会自动构建"
+fi
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Bench - scalability benchmark for the core search engine
+Usage: python bench.py [--scales 1,10,100,1000] [--shapes styles,ux,stack] [--output bench_results.json]
+       python bench.py --stress 10 [--stress-scale 10] [--shapes ...]
+
+Synthetic CSVs are generated from the shipped ones (same header, similar cell
+lengths, vocabulary growing with row count). Each (shape, scale) runs in two
+fresh processes, cold (empty index cache) and warm (cache on disk), so phase
+timings and peak RSS are not polluted by earlier runs.
+
+--stress N starts N workers at once against one cold cache per shape and
+checks the index cache's single-builder protocol: exactly one of them may
+build the index, and every worker must rank the same results.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+QUERY_COUNT = 100
+
+# shape name -> (template CSV relative to DATA_DIR, CSV_CONFIG domain or None for stacks)
+SHAPES = {
+    "styles": ("styles.csv", "style"),
+    "ux": ("ux-guidelines.csv", "ux"),
+    "stack": ("stacks/react.csv", None),
+}
+
+
+# ============ DATA GENERATION ============
+def generate_csv(template, rows, out_path, seed=0):
+    """Write `rows` synthetic rows shaped like the template CSV.
+
+    Cells keep the template's word counts; about a third of the words are
+    swapped for synthetic terms drawn from a pool that grows with the row
+    count (log-uniform, so a few terms are common and most are rare).
+    """
+    rnd = random.Random(seed)
+    with open(template, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames
+        samples = list(reader)
+    pool_size = max(100, int(40 * rows ** 0.7))
+
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        for i in range(rows):
+            base = samples[i % len(samples)]
+            row = {}
+            for col in header:
+                words = str(base.get(col, "")).split()
+                row[col] = " ".join(
+                    f"syn{int(pool_size ** rnd.random())}x" if rnd.random() < 0.33 else word
+                    for word in words)
+            writer.writerow(row)
+
+
+def make_queries(csv_path, search_cols, count=QUERY_COUNT, seed=1):
+    """Queries of 1-3 words sampled from the search columns"""
+    rnd = random.Random(seed)
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        words = [w for row in csv.DictReader(f) for col in search_cols for w in str(row.get(col, "")).split()]
+    words = [w for w in words if len(w) > 2] or ["design"]
+    return [" ".join(rnd.choice(words) for _ in range(rnd.randint(1, 3))) for _ in range(count)]
+
+
+# ============ WORKER ============
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_worker(csv_path, domain, mode):
+    """Time every phase for one CSV in this (fresh) process; returns a dict"""
+    import core
+    from search import format_output
+
+    config = core.CSV_CONFIG[domain] if domain else core._STACK_COLS
+    csv_path = Path(csv_path)
+    queries = make_queries(csv_path, config["search_cols"])
+    timings = {}
+
+    if mode == "cold":
+        # Diagnostic phases, timed in isolation
+        # The same CSV scan the index build does: search fields, key/filter cells, row offsets
+        t = time.perf_counter()
+        documents = core._read_rows(csv_path, config)[1]
+        timings["load_ms"] = _ms(t)
+
+        tokenizer = core.BM25()
+        t = time.perf_counter()
+        for fields in documents:
+            for text in fields:
+                tokenizer.tokenize(text)
+        timings["tokenize_ms"] = _ms(t)
+
+        t = time.perf_counter()
+        core.BM25().fit(documents, [config.get("weights", {}).get(col, 1.0) for col in config["search_cols"]])
+        timings["fit_ms"] = _ms(t)  # includes its own tokenization
+
+    # The real path from here on: total_ms covers index load/build, scoring and formatting
+    # (formatting includes parsing the winning rows from the CSV)
+    start = time.perf_counter()
+    index = core.load_index(csv_path, config)
+    # Cold: parse + fit + write the on-disk cache; warm: read the cache
+    timings["index_build_ms" if mode == "cold" else "cache_load_ms"] = _ms(start)
+
+    t = time.perf_counter()
+    ranked = [index.bm25.score(query, top_k=core.MAX_RESULTS) for query in queries]
+    timings["score_ms_per_query"] = round(_ms(t) / len(queries), 4)
+
+    t = time.perf_counter()
+    for query, hits in zip(queries, ranked):
+        rows = index.rows.fetch([idx for idx, _ in hits])
+        format_output({"domain": domain or "stack", "query": query, "file": csv_path.name,
+                       "count": len(rows), "results": rows})
+    timings["format_ms_per_query"] = round(_ms(t) / len(queries), 4)
+    timings["total_ms"] = _ms(start)
+
+    return {
+        "timings": timings,
+        "vocab": len(index.bm25.postings),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_stress_worker(csv_path, domain):
+    """Load one index from a (possibly cold, shared) cache; report whether this process built it"""
+    import core
+
+    config = core.CSV_CONFIG[domain] if domain else core._STACK_COLS
+    queries = make_queries(Path(csv_path), config["search_cols"], count=10)
+    profiler = core.Profiler(allocations=False)
+    start = time.perf_counter()
+    with core.profiling(profiler):
+        index = core.load_index(csv_path, config)
+    ms = _ms(start)
+    phases = profiler.report()
+    return {
+        "built": phases.get("fit", {}).get("calls", 0),
+        "lock_wait_ms": phases.get("lock_wait", {}).get("ms", 0),
+        "load_ms": ms,
+        "hits": [index.bm25.score(query, top_k=core.MAX_RESULTS) for query in queries],
+    }
+
+
+# ============ DRIVER ============
+def _start(csv_path, domain, mode, cache_dir):
+    env = dict(os.environ, UIPRO_CACHE_DIR=str(cache_dir))
+    env.pop("UIPRO_NO_CACHE", None)
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", mode, "--csv", str(csv_path)]
+    if domain:
+        cmd += ["--domain", domain]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+
+
+def _collect(proc, mode, csv_path):
+    stdout, stderr = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"worker failed ({mode}, {csv_path.name}):\n{stderr.strip()}")
+    return json.loads(stdout)
+
+
+def _spawn(csv_path, domain, mode, cache_dir):
+    return _collect(_start(csv_path, domain, mode, cache_dir), mode, csv_path)
+
+
+def run_suite(shapes, scales):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="uipro-bench-") as tmp:
+        tmp = Path(tmp)
+        for shape in shapes:
+            template, domain = SHAPES[shape]
+            template = DATA_DIR / template
+            with open(template, 'r', encoding='utf-8') as f:
+                base_rows = sum(1 for _ in csv.DictReader(f))
+            for scale in scales:
+                rows = base_rows * scale
+                csv_path = tmp / f"{shape}-x{scale}.csv"
+                generate_csv(template, rows, csv_path)
+                cache_dir = tmp / f"cache-{shape}-x{scale}"
+                entry = {"shape": shape, "scale": scale, "rows": rows, "bytes": csv_path.stat().st_size}
+                for mode in ("cold", "warm"):
+                    entry[mode] = _spawn(csv_path, domain, mode, cache_dir)
+                results.append(entry)
+                print(f"[bench] {shape} x{scale}: {rows} rows, "
+                      f"cold {entry['cold']['timings']['total_ms']:.0f} ms, "
+                      f"warm {entry['warm']['timings']['total_ms']:.0f} ms", file=sys.stderr)
+    return results
+
+
+def run_stress(shapes, scale, processes):
+    """N simultaneous cold workers per shape; returns (results, ok)"""
+    results, ok = [], True
+    with tempfile.TemporaryDirectory(prefix="uipro-stress-") as tmp:
+        tmp = Path(tmp)
+        for shape in shapes:
+            template, domain = SHAPES[shape]
+            with open(DATA_DIR / template, 'r', encoding='utf-8') as f:
+                rows = sum(1 for _ in csv.DictReader(f)) * scale
+            csv_path = tmp / f"{shape}-x{scale}.csv"
+            generate_csv(DATA_DIR / template, rows, csv_path)
+            cache_dir = tmp / f"cache-{shape}"
+            start = time.perf_counter()
+            procs = [_start(csv_path, domain, "stress", cache_dir) for _ in range(processes)]
+            workers = [_collect(proc, "stress", csv_path) for proc in procs]
+            entry = {
+                "shape": shape, "scale": scale, "rows": rows, "processes": processes, "wall_ms": _ms(start),
+                "builds": sum(w["built"] for w in workers),
+                "consistent": all(w["hits"] == workers[0]["hits"] for w in workers),
+                "max_lock_wait_ms": max(w["lock_wait_ms"] for w in workers),
+                "max_load_ms": max(w["load_ms"] for w in workers),
+            }
+            ok = ok and entry["builds"] == 1 and entry["consistent"]
+            results.append(entry)
+            print(f"[stress] {shape} x{scale}: {processes} processes, {entry['builds']} build(s), "
+                  f"{'consistent' if entry['consistent'] else 'INCONSISTENT'} results, "
+                  f"wall {entry['wall_ms']:.0f} ms", file=sys.stderr)
+    return results, ok
+
+
+def _has_numpy():
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max scalability benchmark")
+    parser.add_argument("--scales", default="1,10,100,1000", help="Row multipliers (default: 1,10,100,1000)")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"CSV shapes ({', '.join(SHAPES)})")
+    parser.add_argument("--output", "-o", default="bench_results.json", help="JSON report path")
+    parser.add_argument("--stress", type=int, metavar="N",
+                        help="Instead of timing: start N processes at once on a cold cache and check one builds")
+    parser.add_argument("--stress-scale", type=int, default=10, help="Row multiplier for --stress (default: 10)")
+    parser.add_argument("--worker", choices=["cold", "warm", "stress"], help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    parser.add_argument("--domain", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == "stress":
+        print(json.dumps(run_stress_worker(args.csv, args.domain)))
+        raise SystemExit(0)
+    if args.worker:
+        print(json.dumps(run_worker(args.csv, args.domain, args.worker)))
+        raise SystemExit(0)
+
+    shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+    unknown = [s for s in shapes if s not in SHAPES]
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(unknown)}")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    if args.stress:
+        results, ok = run_stress(shapes, args.stress_scale, args.stress)
+        if args.output != parser.get_default("output"):
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({"python": platform.python_version(), "stress": results}, f, indent=2, sort_keys=True)
+                f.write("\n")
+        raise SystemExit(0 if ok else 1)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": _has_numpy(),
+        "scales": scales,
+        "results": run_suite(shapes, scales),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"[bench] report written to {args.output}", file=sys.stderr)
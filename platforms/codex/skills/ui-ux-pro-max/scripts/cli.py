@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max CLI - argument parsing and markdown rendering behind search.py
+
+Kept out of search.py itself: a script run as __main__ is compiled from
+source on every call, an imported module loads from its bytecode cache
+(written at install by search.py --build-index).
+"""
+
+import argparse
+import os
+import sys
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, SOCKET_PATH, run_request, run_batch, profiling
+
+
+VALUE_CHARS = 300      # longest value printed in full without an output budget
+MIN_VALUE_CHARS = 40   # a budget never cuts a value shorter than this
+BYTES_PER_TOKEN = 4    # rough conversion for --max-tokens
+
+
+def _format_row(output, row, limit=VALUE_CHARS):
+    for key, value in row.items():
+        if key.startswith("_"):
+            continue
+        value_str = str(value)
+        if len(value_str) > limit:
+            value_str = value_str[:limit] + "..."
+        output.append(f"- **{key}:** {value_str}")
+    output.append("")
+
+
+def _sections(result):
+    """Output of a result as a flat list of text blocks and (title, row) entries, in rank order"""
+    if "error" in result:
+        return [f"Error: {result['error']}"]
+    if result.get("domain") == "design-system":
+        product = result["product"]
+        sections = ["## UI Pro Max Design System\n"
+                    f"**Product:** {product.get('Product Type', '')} | **Query:** {result['query']}\n",
+                    ("### Product", product)]
+        for key, title, name_col in (("style", "Style", "Style Category"), ("color", "Colors", "Product Type"),
+                                     ("typography", "Typography", "Font Pairing Name")):
+            for row in result[key]:
+                sections.append((f"### {title}: {row.get(name_col, '')}" +
+                                 (" (by search)" if row.get("_via") == "search" else ""), row))
+        if result.get("stack"):
+            sections += _sections(result["stack"])
+        return sections
+
+    if result.get("stack"):
+        header = ["## UI Pro Max Stack Guidelines", f"**Stack:** {result['stack']} | **Query:** {result['query']}"]
+    else:
+        header = ["## UI Pro Max Search Results", f"**Domain:** {result['domain']} | **Query:** {result['query']}"]
+    header.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+    sections = ["\n".join(header)]
+    for i, row in enumerate(result['results'], 1):
+        if "_source" in row:
+            sections.append((f"### Result {i} ({row['_source']}, score {row['_score']})", row))
+        else:
+            sections.append((f"### Result {i}", row))
+    return sections
+
+
+def _render(title, row, limit):
+    output = [title]
+    _format_row(output, row, limit)
+    return "\n".join(output)
+
+
+def _size(text):
+    return len(text.encode("utf-8")) + 1  # plus the newline joining it to the next block
+
+
+def iter_output(result, max_bytes=None):
+    """Yield the markdown output block by block, best result first.
+
+    Without max_bytes every value is cut at VALUE_CHARS. With it, each
+    result gets a share of the remaining budget weighted by 1 / rank, and
+    its values are cut shorter (halving, down to MIN_VALUE_CHARS) until the
+    block fits that share; once a result does not fit at all, the rest are
+    replaced by a one-line note. Headers are always printed.
+    """
+    sections = _sections(result)
+    entries = [i for i, section in enumerate(sections) if isinstance(section, tuple)]
+    weights = {i: 1 / rank for rank, i in enumerate(entries, 1)}
+    remaining = max_bytes
+
+    for i, section in enumerate(sections):
+        if not isinstance(section, tuple):
+            block = section
+        elif max_bytes is None:
+            block = _render(*section, VALUE_CHARS)
+        else:
+            share = remaining * weights[i] / sum(weights[j] for j in entries if j >= i)
+            limit = VALUE_CHARS
+            block = _render(*section, limit)
+            while _size(block) > share and limit > MIN_VALUE_CHARS:
+                limit = max(MIN_VALUE_CHARS, limit // 2)
+                block = _render(*section, limit)
+            if _size(block) > remaining:
+                omitted = sum(1 for j in entries if j >= i)
+                yield f"_{omitted} more result{'s' if omitted > 1 else ''} omitted to fit the output budget_"
+                return
+        if remaining is not None:
+            remaining -= _size(block)
+        yield block
+
+
+def format_output(result, max_bytes=None):
+    """Format results for Claude consumption (token-optimized)"""
+    return "\n".join(iter_output(result, max_bytes))
+
+
+def run_profiled(request, as_json, dump=None, max_bytes=None):
+    """Answer and render one request locally under core.profiling().
+
+    Returns (rendered output, profiler). In JSON mode the phase report is
+    added to the result as "timings"; dump writes cProfile stats as well.
+    """
+    import json
+    profile = None
+    if dump:
+        import cProfile
+        profile = cProfile.Profile()
+    with profiling() as profiler:
+        if profile:
+            profile.enable()
+        try:
+            result = run_request(request)
+            with profiler.phase("format"):
+                text = json.dumps(result, indent=2, ensure_ascii=False) if as_json else format_output(result, max_bytes)
+        finally:
+            if profile:
+                profile.disable()
+                profile.dump_stats(dump)
+    if as_json:
+        result["timings"] = profiler.report()
+        text = json.dumps(result, indent=2, ensure_ascii=False)
+    return text, profiler
+
+
+def read_batch(stream):
+    """Yield request dicts from an open JSONL text stream, closing it at the end"""
+    import json
+    with stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                request = {"error": f"Bad request: {exc}"}
+            if not isinstance(request, dict):
+                request = {"error": "Bad request: request must be a JSON object"}
+            yield request
+
+
+def main():
+    """Entry point of search.py"""
+    parser = argparse.ArgumentParser(description="UI Pro Max Search")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + ["all"], help="Search domain ('all' searches every domain)")
+    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
+    parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
+    parser.add_argument("--all-stacks", action="store_true", help="With --domain all: also search every stack")
+    parser.add_argument("--rerank", action="store_true",
+                        help="Re-order the top BM25 hits by LSA similarity (needs NumPy; plain BM25 without it)")
+    parser.add_argument("--design-system", action="store_true",
+                        help="Treat the query as a product and combine its linked style, colors and typography (plus --stack guidelines)")
+    parser.add_argument("--fields", "-f", help="Comma-separated columns to keep in each result (e.g. 'Style Category,Keywords')")
+    parser.add_argument("--max-tokens", type=int, help=f"Output budget in tokens (about {BYTES_PER_TOKEN} bytes each); long values are cut first, then low-ranked results dropped")
+    parser.add_argument("--max-bytes", type=int, help="Output budget in bytes (like --max-tokens)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON (budgets apply to markdown output only)")
+    parser.add_argument("--serve", action="store_true", help="Keep indexes warm and answer NDJSON queries on a Unix socket")
+    parser.add_argument("--stdio", action="store_true", help="With --serve: read queries from stdin instead of the socket")
+    parser.add_argument("--no-server", action="store_true", help="Do not forward to a running server")
+    parser.add_argument("--build-index", action="store_true",
+                        help="Build every domain and stack index into the cache and byte-compile the scripts (run once at install)")
+    parser.add_argument("--batch", metavar="FILE", help="Answer JSONL queries from FILE ('-' for stdin), one JSONL result per line")
+    parser.add_argument("--profile", action="store_true",
+                        help="Search locally and report per-phase wall time and allocations (stderr, or 'timings' with --json)")
+    parser.add_argument("--profile-dump", metavar="FILE", help="With --profile: also write cProfile stats to FILE")
+
+    args = parser.parse_args()
+
+    if args.serve:
+        import server
+        if args.stdio:
+            server.serve_stdio()
+        else:
+            server.serve_socket()
+        raise SystemExit(0)
+    if args.build_index:
+        import core
+        if not core.CACHE_ENABLED:
+            parser.error("--build-index needs the disk cache (unset UIPRO_NO_CACHE)")
+        for name, path in core.prebuild():
+            print(f"{name} -> {path}")
+        raise SystemExit(0)
+    if args.batch:
+        import json
+        try:
+            stream = sys.stdin if args.batch == "-" else open(args.batch, 'r', encoding='utf-8')
+        except OSError as exc:
+            parser.error(f"cannot read --batch file: {exc}")
+        for result in run_batch(read_batch(stream)):
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+        raise SystemExit(0)
+    if not args.query:
+        parser.error("query is required unless --serve, --batch or --build-index is given")
+
+    request = {"query": args.query, "domain": args.domain, "stack": args.stack, "max_results": args.max_results,
+               "include_stacks": args.all_stacks, "design_system": args.design_system, "rerank": args.rerank}
+    if args.fields:
+        request["fields"] = args.fields
+    budgets = [b for b in (args.max_bytes, args.max_tokens and args.max_tokens * BYTES_PER_TOKEN) if b]
+    max_bytes = min(budgets) if budgets else None
+    if args.profile or args.profile_dump:
+        text, profiler = run_profiled(request, args.json, args.profile_dump, max_bytes)
+        print(text)
+        if not args.json:
+            print(profiler.format(), file=sys.stderr)
+        raise SystemExit(0)
+
+    result = None
+    if not args.no_server and SOCKET_PATH.exists():
+        import server  # socket modules only load when a server may be listening
+        result = server.forward(request)
+    if result is None:
+        result = run_request(request)
+
+    if args.json:
+        import json
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        # Stream block by block so the best results reach the reader first
+        try:
+            for block in iter_output(result, max_bytes):
+                print(block, flush=True)
+        except BrokenPipeError:
+            # The reader stopped early (e.g. piped into head): silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            raise SystemExit(1)